@@ -0,0 +1,51 @@
+"""implement vote counter columns
+
+Revision ID: 5b1e696885ce
+Revises: e915accd875e
+Create Date: 2026-10-18 12:26:05.730118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e696885ce'
+down_revision: Union[str, None] = 'e915accd875e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ['questions', 'answers']:
+        op.add_column(table, sa.Column('score', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('upvote_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('downvote_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill the counters from the existing votes
+    for table, column in [('questions', 'question_id'), ('answers', 'answer_id')]:
+        op.execute(
+            f'''UPDATE {table}
+            SET upvote_count = vote_counts.upvote_count,
+                downvote_count = vote_counts.downvote_count,
+                score = vote_counts.upvote_count - vote_counts.downvote_count
+            FROM (
+                SELECT {column},
+                       count(*) FILTER (WHERE is_upvote) AS upvote_count,
+                       count(*) FILTER (WHERE NOT is_upvote) AS downvote_count
+                FROM votes
+                WHERE {column} IS NOT NULL
+                GROUP BY {column}
+            ) AS vote_counts
+            WHERE {table}.id = vote_counts.{column}
+            '''
+        )
+
+
+def downgrade() -> None:
+    for table in ['answers', 'questions']:
+        op.drop_column(table, 'downvote_count')
+        op.drop_column(table, 'upvote_count')
+        op.drop_column(table, 'score')
@@ -0,0 +1,40 @@
+"""reconcile storage item reference counts
+
+Revision ID: 6447f3afb337
+Revises: 6556772f6ffe
+Create Date: 2026-10-18 19:10:42.275841
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6447f3afb337'
+down_revision: Union[str, None] = '6556772f6ffe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Reference counts became the source of truth for storage GC. Items
+    # stored before they existed were given a count of 1, recount them
+    # from the users, so that orphaned avatars can be collected.
+    op.execute(
+        sa.text(
+            '''UPDATE storage_items
+            SET reference_count = (
+                SELECT count(*)
+                FROM users
+                WHERE users.avatar_file_storage_id = storage_items.id
+            )
+            WHERE parent_id IS NULL
+            '''
+        )
+    )
+
+
+def downgrade() -> None:
+    pass
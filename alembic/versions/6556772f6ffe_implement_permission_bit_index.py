@@ -0,0 +1,79 @@
+"""implement permission bit index
+
+Revision ID: 6556772f6ffe
+Revises: 4cc94af68d09
+Create Date: 2026-10-18 18:24:07.913562
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6556772f6ffe'
+down_revision: Union[str, None] = '4cc94af68d09'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Snapshot of the permission registry at this revision, the migration
+# must not change along with app.common.constants.PERMISSION_BIT_INDEXES.
+PERMISSION_BIT_INDEXES = {
+    'read_any_question': 0,
+    'create_own_question': 1,
+    'update_own_question': 2,
+    'delete_own_question': 3,
+    'update_any_question': 4,
+    'delete_any_question': 5,
+    'read_any_answer': 6,
+    'create_own_answer': 7,
+    'update_own_answer': 8,
+    'delete_own_answer': 9,
+    'update_any_answer': 10,
+    'delete_any_answer': 11,
+    'read_any_comment': 12,
+    'create_own_comment': 13,
+    'update_own_comment': 14,
+    'delete_own_comment': 15,
+    'update_any_comment': 16,
+    'delete_any_comment': 17,
+    'upvote': 18,
+    'downvote': 19,
+    'create_permission': 20,
+    'attach_permission': 21,
+    'create_role': 22,
+    'attach_role': 23,
+    'ban_user': 24,
+    'unban_user': 25,
+    'create_tag': 26,
+    'delete_tag': 27
+}
+
+
+def upgrade() -> None:
+    op.add_column('permissions', sa.Column('bit_index', sa.Integer(), nullable=True))
+
+    connection = op.get_bind()
+    permissions_table = sa.table(
+        'permissions',
+        sa.column('id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('bit_index', sa.Integer)
+    )
+
+    # Registered permissions take their registered bit
+    for name, bit_index in PERMISSION_BIT_INDEXES.items():
+        connection.execute(
+            sa.update(permissions_table)
+            .where(permissions_table.c.name == name)
+            .values(bit_index=bit_index)
+        )
+
+    # The others keep no bit, they can't be required by any route
+    op.create_unique_constraint('permissions_bit_index_key', 'permissions', ['bit_index'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('permissions_bit_index_key', 'permissions', type_='unique')
+    op.drop_column('permissions', 'bit_index')
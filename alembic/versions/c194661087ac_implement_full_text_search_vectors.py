@@ -0,0 +1,53 @@
+"""implement full text search vectors
+
+Revision ID: c194661087ac
+Revises: 7b3f54075dc6
+Create Date: 2026-10-18 10:12:31.482907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.common.constants import FULL_TEXT_SEARCH_CONFIG
+
+# revision identifiers, used by Alembic.
+revision: str = 'c194661087ac'
+down_revision: Union[str, None] = '7b3f54075dc6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('questions', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            f"setweight(to_tsvector('{FULL_TEXT_SEARCH_CONFIG}', "
+            f"coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{FULL_TEXT_SEARCH_CONFIG}', "
+            f"coalesce(body, '')), 'B')",
+            persisted=True
+        ),
+        nullable=True
+    ))
+    op.create_index('ix_questions_search_vector', 'questions', ['search_vector'], unique=False, postgresql_using='gin')
+    op.add_column('answers', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            f"to_tsvector('{FULL_TEXT_SEARCH_CONFIG}', coalesce(body, ''))",
+            persisted=True
+        ),
+        nullable=True
+    ))
+    op.create_index('ix_answers_search_vector', 'answers', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_answers_search_vector', table_name='answers', postgresql_using='gin')
+    op.drop_column('answers', 'search_vector')
+    op.drop_index('ix_questions_search_vector', table_name='questions', postgresql_using='gin')
+    op.drop_column('questions', 'search_vector')
@@ -0,0 +1,33 @@
+"""implement trigram indexes
+
+Revision ID: e915accd875e
+Revises: c194661087ac
+Create Date: 2026-10-18 11:03:47.215634
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e915accd875e'
+down_revision: Union[str, None] = 'c194661087ac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_questions_title_trgm', 'questions', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.create_index('ix_questions_body_trgm', 'questions', ['body'], unique=False, postgresql_using='gin', postgresql_ops={'body': 'gin_trgm_ops'})
+    op.create_index('ix_answers_body_trgm', 'answers', ['body'], unique=False, postgresql_using='gin', postgresql_ops={'body': 'gin_trgm_ops'})
+    op.create_index('ix_tags_name_trgm', 'tags', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tags_name_trgm', table_name='tags', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.drop_index('ix_answers_body_trgm', table_name='answers', postgresql_using='gin', postgresql_ops={'body': 'gin_trgm_ops'})
+    op.drop_index('ix_questions_body_trgm', table_name='questions', postgresql_using='gin', postgresql_ops={'body': 'gin_trgm_ops'})
+    op.drop_index('ix_questions_title_trgm', table_name='questions', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.execute('DROP EXTENSION IF EXISTS pg_trgm')
@@ -1,15 +1,31 @@
 from typing import Text
 
-from sqlalchemy import ForeignKey, UniqueConstraint
+from sqlalchemy import ForeignKey, UniqueConstraint, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.common.models_mixins import int_pk, CreatedAtUpdatedAtMixin
+from app.common.constants import FULL_TEXT_SEARCH_CONFIG
+from app.common.models_mixins import int_pk, CreatedAtUpdatedAtMixin, \
+    VoteCountersMixin
 from app.core.adapters.postgres.postgres_adapter import Base
 
 
-class AnswerModel(CreatedAtUpdatedAtMixin, Base):
+class AnswerModel(CreatedAtUpdatedAtMixin, VoteCountersMixin, Base):
     __tablename__ = 'answers'
-    __table_args__ = (UniqueConstraint('question_id', 'user_id'),)
+    __table_args__ = (
+        UniqueConstraint('question_id', 'user_id'),
+        Index(
+            'ix_answers_search_vector',
+            'search_vector',
+            postgresql_using='gin'
+        ),
+        Index(
+            'ix_answers_body_trgm',
+            'body',
+            postgresql_using='gin',
+            postgresql_ops={'body': 'gin_trgm_ops'}
+        ),
+    )
 
     id: Mapped[int_pk]
     body: Mapped[Text]
@@ -19,6 +35,14 @@ class AnswerModel(CreatedAtUpdatedAtMixin, Base):
     user_id: Mapped[int] = mapped_column(
         ForeignKey('users.id', ondelete='CASCADE')
     )
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"to_tsvector('{FULL_TEXT_SEARCH_CONFIG}', coalesce(body, ''))",
+            persisted=True
+        ),
+        deferred=True
+    )
 
     user: Mapped['UserModel'] = relationship(
         'UserModel',
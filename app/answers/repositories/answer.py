@@ -11,6 +11,5 @@ class AnswerRepository(BaseRepository):
     def _get_default_stmt(self) -> Select:
         return select(self.model).options(
             joinedload(self.model.user),
-            joinedload(self.model.question),
-            joinedload(self.model.votes)
+            joinedload(self.model.question)
         )
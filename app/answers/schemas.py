@@ -31,31 +31,22 @@ class AnswerOutSchema(AnswerBaseSchema, CreatedAtUpdatedAtMixin):
     id: int
     user_id: int
     question_id: int
+    score: int = 0
+    upvote_count: int = 0
+    downvote_count: int = 0
     votes: list[VoteOutSchema] | None = Field(None, exclude=True)
 
     # Returns the difference of votes for the answer.
+    # Kept for compatibility, it mirrors the denormalized score.
     @computed_field
     @cached_property
     def votes_difference(self) -> int:
-        if self.votes:
-            upvotes = sum(vote.is_upvote for vote in self.votes)
-            downvotes = len(self.votes) - upvotes
-            return upvotes - downvotes
-        return 0
+        return self.score
 
 
 class AnswerWithCommentsOutSchema(AnswerOutSchema):
     comments: list[CommentOutSchema]
-    current_user_id: int | None = Field(None, exclude=True)
-
-    # Checks if the current user has voted on the answer.
-    # If the user has voted, it returns the VoteOutSchema.
-    # If the user has not voted, it returns None.
-    @computed_field
-    @cached_property
-    def current_user_vote(self) -> VoteOutSchema | None:
-        vote_dict = {vote.user_id: vote for vote in self.votes}
-        return vote_dict.get(self.current_user_id, None)
+    current_user_vote: VoteOutSchema | None = None
 
 
 class AnswerWithJoinsOutSchema(AnswerOutSchema):
@@ -8,9 +8,13 @@ from app.answers.schemas import AnswerCreateSchema, AnswerUpdateSchema, \
     AnswerWithJoinsOutSchema, \
     AnswerCreatePayloadSchema, \
     AnswerOutSchema
+from app.auth.schemas import SecurityContextSchema
+from app.auth.services import AuthService
+from app.common.constants import SEARCH_CACHE_NAMESPACE
+from app.common.repositories import CacheRepository
+from app.common.utils import get_question_cache_namespace
 from app.questions.repositories import QuestionRepository
 from app.users.repositories import UserRepository
-from app.users.services import UserService
 
 
 class AnswerService:
@@ -19,12 +23,17 @@ class AnswerService:
             answer_repository: Annotated[AnswerRepository, Depends()],
             question_repository: Annotated[QuestionRepository, Depends()],
             user_repository: Annotated[UserRepository, Depends()],
-            user_service: Annotated[UserService, Depends()]
+            security_context: Annotated[
+                SecurityContextSchema,
+                Depends(AuthService.get_security_context)
+            ],
+            cache_repository: Annotated[CacheRepository, Depends()]
     ) -> None:
         self.answer_repository = answer_repository
         self.question_repository = question_repository
         self.user_repository = user_repository
-        self.user_service = user_service
+        self.security_context = security_context
+        self.cache_repository = cache_repository
 
     async def create_answer(
             self,
@@ -39,12 +48,20 @@ class AnswerService:
             answer_schema.question_id
         )
         try:
-            return await self.answer_repository.create(answer_schema)
+            answer = await self.answer_repository.create(answer_schema)
         except IntegrityError:
             raise HTTPException(
                 status_code=400,
                 detail='You have already answered this question'
             )
+        await self.question_repository.update_last_activity(
+            answer.question_id
+        )
+        await self.cache_repository.bump_generation(SEARCH_CACHE_NAMESPACE)
+        await self.cache_repository.bump_generation(
+            get_question_cache_namespace(answer.question_id)
+        )
+        return answer
 
     async def update_answer(
             self,
@@ -53,15 +70,20 @@ class AnswerService:
             answer_schema: AnswerUpdateSchema
     ) -> AnswerWithJoinsOutSchema:
         answer = await self.answer_repository.get_entity_if_exists(answer_id)
-        user_permissions = await self.user_service.get_user_permissions(
-            user_id
+        AuthService.ensure_owner_or_permission(
+            self.security_context,
+            answer.user_id,
+            'update_any_answer',
+            'You are not allowed to update this answer'
         )
-        if answer.user_id != user_id and 'update_any_answer' not in user_permissions:
-            raise HTTPException(
-                status_code=403,
-                detail='You are not allowed to update this answer'
-            )
         await self.answer_repository.update(answer_id, answer_schema)
+        await self.question_repository.update_last_activity(
+            answer.question_id
+        )
+        await self.cache_repository.bump_generation(SEARCH_CACHE_NAMESPACE)
+        await self.cache_repository.bump_generation(
+            get_question_cache_namespace(answer.question_id)
+        )
         await self.answer_repository.expire_session_for_all()
         answer = await self.answer_repository.get_by_id_with_joins(
             answer_id
@@ -77,12 +99,15 @@ class AnswerService:
             user_id: int
     ) -> bool:
         answer = await self.answer_repository.get_entity_if_exists(answer_id)
-        user_permissions = await self.user_service.get_user_permissions(
-            user_id
+        AuthService.ensure_owner_or_permission(
+            self.security_context,
+            answer.user_id,
+            'delete_any_answer',
+            'You are not allowed to delete this answer'
         )
-        if answer.user_id != user_id and 'delete_any_answer' not in user_permissions:
-            raise HTTPException(
-                status_code=403,
-                detail='You are not allowed to delete this answer'
-            )
-        return await self.answer_repository.delete(answer_id)
+        is_deleted = await self.answer_repository.delete(answer_id)
+        await self.cache_repository.bump_generation(SEARCH_CACHE_NAMESPACE)
+        await self.cache_repository.bump_generation(
+            get_question_cache_namespace(answer.question_id)
+        )
+        return is_deleted
@@ -1,36 +1,187 @@
-from typing import Annotated
+import hashlib
+import time
+from typing import Annotated, AsyncIterator
 
+import jwt
 from aioredis import Redis
 from fastapi import Depends
 
+from app.common.constants import AUTH_SESSIONS_KEY, AUTH_SESSION_KEY, \
+    LEGACY_TOKEN_LIST_KEY_PATTERN
 from app.core.adapters.redis.redis_adapter import get_session
 
 
 class AuthRepository:
+    """ Redis store of the issued access tokens, one per user session.
+    A session, identified by the sid claim, keeps the digest of its
+    current token under a key expiring with the token, and the sessions
+    of a user are indexed in a sorted set scored by that expiry, which
+    is used to evict the oldest ones beyond the limit.
+
+    Tokens used to be pushed onto a list named after the user. Such
+    lists are migrated by migrate_legacy_tokens, lazily when a check
+    fails and in bulk by drain_legacy_token_lists_task. """
+
     def __init__(
             self,
             redis: Annotated[Redis, Depends(get_session)]
     ) -> None:
         self.redis = redis
 
+    @staticmethod
+    def __get_token_digest(
+            token: str
+    ) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
     async def create_token(
             self,
             user_id: str,
-            token: str
+            token: str,
+            session_id: str | None,
+            expires_at: int,
+            max_sessions: int
     ) -> bool:
-        await self.redis.rpush(user_id, token)
+        """
+        Stores the token as the current one of its session, replacing the
+        token the session had before. Tokens without a session id get a
+        session of their own.
+        """
+        now = int(time.time())
+        ttl = expires_at - now
+        if ttl <= 0:
+            return False
+
+        token_digest = self.__get_token_digest(token)
+        session_id = session_id or token_digest
+        sessions_key = AUTH_SESSIONS_KEY.format(user_id=user_id)
+        session_key = AUTH_SESSION_KEY.format(
+            user_id=user_id,
+            session_id=session_id
+        )
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(
+                session_key,
+                token_digest,
+                ex=ttl
+            )
+            pipe.zadd(sessions_key, {session_id: expires_at})
+            pipe.zremrangebyscore(sessions_key, '-inf', now)
+            pipe.zrange(sessions_key, 0, -max_sessions - 1)
+            pipe.zrange(sessions_key, -1, -1, withscores=True)
+            *_, evicted_session_ids, latest_sessions = await pipe.execute()
+
+        # The index lives as long as its longest session, a token replayed
+        # with a shorter lifetime must not shorten it.
+        for _, latest_expires_at in latest_sessions:
+            await self.redis.expireat(sessions_key, int(latest_expires_at))
+
+        if evicted_session_ids:
+            await self.__delete_sessions(user_id, evicted_session_ids)
         return True
 
     async def check_token(
             self,
             user_id: str,
-            token: str
+            token: str,
+            session_id: str | None
     ) -> bool:
-        tokens = await self.redis.lrange(user_id, 0, -1)
-        return token.encode() in tokens
+        token_digest = self.__get_token_digest(token)
+        stored_digest = await self.redis.get(
+            AUTH_SESSION_KEY.format(
+                user_id=user_id,
+                session_id=session_id or token_digest
+            )
+        )
+        return (
+            stored_digest is not None
+            and stored_digest.decode() == token_digest
+        )
+
+    async def __delete_sessions(
+            self,
+            user_id: str,
+            session_ids: list[bytes | str]
+    ) -> None:
+        session_ids = [
+            session_id.decode() if isinstance(session_id, bytes)
+            else session_id
+            for session_id in session_ids
+        ]
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(AUTH_SESSIONS_KEY.format(user_id=user_id), *session_ids)
+            pipe.delete(
+                *(
+                    AUTH_SESSION_KEY.format(
+                        user_id=user_id,
+                        session_id=session_id
+                    )
+                    for session_id in session_ids
+                )
+            )
+            await pipe.execute()
+
+    async def delete_session(
+            self,
+            user_id: str,
+            session_id: str
+    ) -> bool:
+        await self.__delete_sessions(user_id, [session_id])
+        return True
 
     async def delete_user_tokens(
             self,
             user_id: str
     ) -> bool:
-        return await self.redis.delete(user_id)
+        sessions_key = AUTH_SESSIONS_KEY.format(user_id=user_id)
+        session_ids = await self.redis.zrange(sessions_key, 0, -1)
+        if session_ids:
+            await self.__delete_sessions(user_id, session_ids)
+        # Also drops a legacy list.
+        await self.redis.delete(sessions_key, user_id)
+        return True
+
+    async def migrate_legacy_tokens(
+            self,
+            user_id: str,
+            max_sessions: int
+    ) -> int:
+        """
+        Moves the unexpired tokens of a legacy list into sessions and
+        deletes the list. Returns the number of migrated tokens.
+        """
+        if await self.redis.type(user_id) != b'list':
+            return 0
+        tokens = await self.redis.lrange(user_id, 0, -1)
+
+        migrated = 0
+        for token in tokens:
+            token = token.decode()
+            try:
+                claims = jwt.decode(
+                    token,
+                    options={'verify_signature': False}
+                )
+            except jwt.PyJWTError:
+                continue
+
+            migrated += await self.create_token(
+                user_id,
+                token,
+                claims.get('sid'),
+                claims.get('exp', 0),
+                max_sessions
+            )
+
+        await self.redis.delete(user_id)
+        return migrated
+
+    async def iterate_legacy_token_lists(
+            self
+    ) -> AsyncIterator[str]:
+        async for key in self.redis.scan_iter(
+                match=LEGACY_TOKEN_LIST_KEY_PATTERN,
+                _type='list'
+        ):
+            yield key.decode()
@@ -7,8 +7,15 @@ class TokenBaseSchema(BaseModel):
     token_type: str
 
 
+class SecurityContextSchema(BaseModel):
+    user_id: int | None = None
+    permission_mask: int = 0
+
+
 class DecodedTokenBaseSchema(BaseModel):
     sub: str
+    sid: str | None = None
+    exp: int
 
 
 class EmailCreateSchema(BaseModel):
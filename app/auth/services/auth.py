@@ -3,19 +3,30 @@ from typing import Annotated
 import jwt
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from jwcrypto.common import JWException
+from pydantic import ValidationError
 
 from app.auth.repositories import AuthRepository
-from app.auth.schemas import TokenBaseSchema, EmailCreateSchema
+from app.auth.schemas import TokenBaseSchema, EmailCreateSchema, \
+    SecurityContextSchema
+from app.common.caches import TTLCache
+from app.common.constants import PRINCIPAL_CACHE_NAMESPACE
+from app.common.repositories import CacheRepository
 from app.common.services import KeycloakService
-from app.dependencies import oauth2_scheme
+from app.common.utils import get_principal_cache_namespace, \
+    get_permission_mask
+from app.dependencies import oauth2_scheme, get_settings
 from app.roles.repositories import RoleRepository
 from app.users.repositories import UserRepository
 from app.users.schemas import UserOutSchema, UserInRequestSchema, \
     UserCreatePayloadSchema, UserCreateSchema
 
 
+settings = get_settings()
+
+
 class AuthService:
+    principal_cache = TTLCache(settings.PRINCIPAL_CACHE_L1_SIZE)
+
     def __init__(
             self,
             user_repository: Annotated[UserRepository, Depends()],
@@ -38,15 +49,81 @@ class AuthService:
             )
         return request.state.user_id
 
+    @classmethod
+    async def __get_principal(
+            cls,
+            external_user_id: str,
+            user_repository: UserRepository,
+            cache_repository: CacheRepository
+    ) -> UserInRequestSchema | None:
+        """
+        Resolves the user and the permission mask behind a token. Principals
+        are kept for a few seconds in process, then in Redis under the
+        global and the per-user principal generations, which the role,
+        permission and user services bump on changes. The generations
+        are read before the database, so that a principal loaded
+        concurrently with a change is stored under the outdated key.
+        """
+        principal = cls.principal_cache.get(external_user_id)
+        if principal is not None:
+            return principal
+
+        generations = await cache_repository.get_generations(
+            [
+                PRINCIPAL_CACHE_NAMESPACE,
+                get_principal_cache_namespace(external_user_id)
+            ]
+        )
+        cache_key = (
+            f'{PRINCIPAL_CACHE_NAMESPACE}:{external_user_id}:'
+            f'{generations[0]}:{generations[1]}'
+        )
+        cached = await cache_repository.get_json(cache_key)
+        if cached is not None:
+            try:
+                principal = UserInRequestSchema.model_validate(cached)
+            except ValidationError:
+                # Left by a previous version of the schema.
+                principal = None
+
+        if principal is None:
+            user = await user_repository.get_one(
+                {'external_id': external_user_id}
+            )
+            if user is None:
+                return None
+
+            principal = UserInRequestSchema.model_validate(
+                {
+                    **user.__dict__,
+                    'permission_mask': await (
+                        user_repository.get_user_permission_mask(user.id)
+                    )
+                }
+            )
+            await cache_repository.set_json(
+                cache_key,
+                principal.model_dump(mode='json'),
+                settings.PRINCIPAL_CACHE_TTL
+            )
+
+        cls.principal_cache.set(
+            external_user_id,
+            principal,
+            settings.PRINCIPAL_CACHE_L1_TTL
+        )
+        return principal
+
     @classmethod
     async def get_user_from_jwt(
             cls,
             request: Request,
             user_repository: Annotated[UserRepository, Depends()],
             auth_repository: Annotated[AuthRepository, Depends()],
+            cache_repository: Annotated[CacheRepository, Depends()],
             keycloak_service: Annotated[KeycloakService, Depends()],
             token: str = Depends(oauth2_scheme)
-    ) -> UserOutSchema | None:
+    ) -> UserInRequestSchema:
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Could not validate credentials',
@@ -57,40 +134,45 @@ class AuthService:
             payload = await keycloak_service.decode_token(token)
 
             external_user_id = payload.sub
-            user = await user_repository.get_one(
-                {'external_id': external_user_id}
-            )
             token_exists = await auth_repository.check_token(
                 external_user_id,
-                token
+                token,
+                payload.sid
             )
+            # The token may still sit in a legacy token list.
+            if not token_exists and await (
+                    auth_repository.migrate_legacy_tokens(
+                        external_user_id,
+                        settings.AUTH_MAX_SESSIONS
+                    )
+            ):
+                token_exists = await auth_repository.check_token(
+                    external_user_id,
+                    token,
+                    payload.sid
+                )
+            # A token replaced by a refresh or of an evicted session only
+            # fails itself, the other sessions of the user are kept.
             if not token_exists:
-                await auth_repository.delete_user_tokens(external_user_id)
                 raise HTTPException(
                     status_code=400,
                     detail='Token is invalid'
                 )
 
-            if user.id is None:
-                raise credentials_exception
-
-        except JWException:
+        except jwt.PyJWTError:
             raise credentials_exception
 
-        user = await user_repository.get_by_id_with_roles(user.id)
+        user = await cls.__get_principal(
+            external_user_id,
+            user_repository,
+            cache_repository
+        )
         if user is None:
             raise credentials_exception
-        user_permissions = await user_repository.get_user_permissions(user.id)
 
         request.state.user_id = user.id
-        user_schema = UserInRequestSchema.model_validate(
-            {
-                **user.__dict__,
-                'permissions': user_permissions
-            }
-        )
-        request.state.user = user_schema
-        return UserOutSchema.model_validate(user)
+        request.state.user = user
+        return user
 
     async def sign_up(
             self,
@@ -131,26 +213,29 @@ class AuthService:
         tokens = await self.keycloak_service.get_tokens_by_user_credentials(
             form_data
         )
-        access_token = tokens.access_token
-        payload = await self.keycloak_service.decode_token(access_token)
-        external_user_id = payload.sub
-        await self.auth_repository.create_token(external_user_id, access_token)
+        await self.__store_access_token(tokens.access_token)
         return tokens
 
+    async def __store_access_token(
+            self,
+            access_token: str
+    ) -> None:
+        payload = await self.keycloak_service.decode_token(access_token)
+        await self.auth_repository.create_token(
+            payload.sub,
+            access_token,
+            payload.sid,
+            payload.exp,
+            settings.AUTH_MAX_SESSIONS
+        )
+
     async def refresh(
             self,
             refresh_token: str
     ) -> TokenBaseSchema:
         tokens = await self.keycloak_service.refresh_token(refresh_token)
-        payload = jwt.decode(
-            refresh_token, options={'verify_signature': False}
-        )
-        external_user_id = payload.get('sub')
-        await self.auth_repository.delete_user_tokens(external_user_id)
-        await self.auth_repository.create_token(
-            external_user_id,
-            tokens.access_token
-        )
+        # The new token replaces the previous one of the same session.
+        await self.__store_access_token(tokens.access_token)
         return tokens
 
     async def logout(
@@ -162,7 +247,14 @@ class AuthService:
             refresh_token, options={'verify_signature': False}
         )
         external_user_id = payload.get('sub')
-        await self.auth_repository.delete_user_tokens(external_user_id)
+        session_id = payload.get('sid')
+        if session_id:
+            await self.auth_repository.delete_session(
+                external_user_id,
+                session_id
+            )
+        else:
+            await self.auth_repository.delete_user_tokens(external_user_id)
         return True
 
     async def forgot_password(
@@ -187,18 +279,55 @@ class AuthService:
 
         return True
 
+    @staticmethod
+    async def get_security_context(
+            request: Request
+    ) -> SecurityContextSchema:
+        """
+        Exposes the principal resolved by get_user_from_jwt to services.
+        Requests which were not authenticated get an anonymous context.
+        """
+        user = getattr(request.state, 'user', None)
+        if user is None:
+            return SecurityContextSchema()
+        return SecurityContextSchema(
+            user_id=user.id,
+            permission_mask=user.permission_mask
+        )
+
+    @staticmethod
+    def ensure_owner_or_permission(
+            security_context: SecurityContextSchema,
+            owner_id: int,
+            permission: str,
+            detail: str
+    ) -> None:
+        if (
+                security_context.user_id is None
+                or (
+                    security_context.user_id != owner_id
+                    and not security_context.permission_mask
+                    & get_permission_mask({permission})
+                )
+        ):
+            raise HTTPException(
+                status_code=403,
+                detail=detail
+            )
+
     @staticmethod
     def require_permissions(
             required_permissions: set[str]
     ) -> callable:
+        # Compiled once, when the route is declared.
+        required_mask = get_permission_mask(required_permissions)
+
         def check_permissions(
                 request: Request
         ) -> bool:
             user = request.state.user
 
-            user_permissions = user.permissions
-
-            if not required_permissions.issubset(user_permissions):
+            if user.permission_mask & required_mask != required_mask:
                 raise HTTPException(
                     status_code=403,
                     detail='Permission denied'
@@ -17,11 +17,13 @@ class CommentModel(CreatedAtUpdatedAtMixin, Base):
     )
     question_id: Mapped[int] = mapped_column(
         ForeignKey('questions.id', ondelete='CASCADE'),
-        nullable=True
+        nullable=True,
+        index=True
     )
     answer_id: Mapped[int] = mapped_column(
         ForeignKey('answers.id', ondelete='CASCADE'),
-        nullable=True
+        nullable=True,
+        index=True
     )
 
     user: Mapped['UserModel'] = relationship(
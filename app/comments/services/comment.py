@@ -3,11 +3,15 @@ from typing import Annotated
 from fastapi import Depends, HTTPException
 
 from app.answers.repositories import AnswerRepository
+from app.auth.schemas import SecurityContextSchema
+from app.auth.services import AuthService
+from app.comments.models import CommentModel
 from app.comments.repositories import CommentRepository
 from app.comments.schemas import CommentCreateSchema, CommentOutSchema, \
     CommentCreatePayloadSchema, CommentUpdateSchema
+from app.common.repositories import CacheRepository
+from app.common.utils import get_question_cache_namespace
 from app.questions.repositories import QuestionRepository
-from app.users.services import UserService
 
 
 class CommentService:
@@ -16,12 +20,42 @@ class CommentService:
             comment_repository: Annotated[CommentRepository, Depends()],
             question_repository: Annotated[QuestionRepository, Depends()],
             answer_repository: Annotated[AnswerRepository, Depends()],
-            user_service: Annotated[UserService, Depends()]
+            security_context: Annotated[
+                SecurityContextSchema,
+                Depends(AuthService.get_security_context)
+            ],
+            cache_repository: Annotated[CacheRepository, Depends()]
     ) -> None:
         self.comment_repository = comment_repository
         self.question_repository = question_repository
         self.answer_repository = answer_repository
-        self.user_service = user_service
+        self.security_context = security_context
+        self.cache_repository = cache_repository
+
+    async def __get_question_id(
+            self,
+            comment: CommentModel
+    ) -> int | None:
+        if comment.question_id is not None:
+            return comment.question_id
+        answer = await self.answer_repository.get_by_id(comment.answer_id)
+        return answer.question_id if answer else None
+
+    async def __bump_question_version(
+            self,
+            question_id: int | None
+    ) -> None:
+        if question_id is not None:
+            await self.cache_repository.bump_generation(
+                get_question_cache_namespace(question_id)
+            )
+
+    async def __update_question_activity(
+            self,
+            question_id: int | None
+    ) -> None:
+        if question_id is not None:
+            await self.question_repository.update_last_activity(question_id)
 
     async def create_comment(
             self,
@@ -40,7 +74,11 @@ class CommentService:
             await self.answer_repository.get_entity_if_exists(
                 comment_schema.answer_id
             )
-        return await self.comment_repository.create(comment_schema)
+        comment = await self.comment_repository.create(comment_schema)
+        question_id = await self.__get_question_id(comment)
+        await self.__update_question_activity(question_id)
+        await self.__bump_question_version(question_id)
+        return comment
 
     async def get_comment(self, comment_id: int) -> CommentOutSchema:
         comment = await self.comment_repository.get_by_id(comment_id)
@@ -60,13 +98,16 @@ class CommentService:
         comment = await self.comment_repository.get_entity_if_exists(
             comment_id
         )
-        user_permissions = await self.user_service.get_user_permissions(user_id)
-        if comment.user_id != user_id and 'update_any_comment' not in user_permissions:
-            raise HTTPException(
-                status_code=403,
-                detail='You are not allowed to update this comment'
-            )
+        AuthService.ensure_owner_or_permission(
+            self.security_context,
+            comment.user_id,
+            'update_any_comment',
+            'You are not allowed to update this comment'
+        )
         await self.comment_repository.update(comment_id, comment_schema)
+        question_id = await self.__get_question_id(comment)
+        await self.__update_question_activity(question_id)
+        await self.__bump_question_version(question_id)
         return await self.comment_repository.get_by_id(comment_id)
 
     async def delete_comment(
@@ -77,10 +118,13 @@ class CommentService:
         comment = await self.comment_repository.get_entity_if_exists(
             comment_id
         )
-        user_permissions = await self.user_service.get_user_permissions(user_id)
-        if comment.user_id != user_id and 'delete_any_comment' not in user_permissions:
-            raise HTTPException(
-                status_code=403,
-                detail='You are not allowed to delete this comment'
-            )
-        return await self.comment_repository.delete(comment_id)
+        AuthService.ensure_owner_or_permission(
+            self.security_context,
+            comment.user_id,
+            'delete_any_comment',
+            'You are not allowed to delete this comment'
+        )
+        question_id = await self.__get_question_id(comment)
+        is_deleted = await self.comment_repository.delete(comment_id)
+        await self.__bump_question_version(question_id)
+        return is_deleted
@@ -0,0 +1,57 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """ Bounded in-process LRU cache whose entries also expire.
+    Every entry carries its own deadline, expired entries are dropped
+    when they are read and the least recently used one is evicted when
+    the cache is full. Meant for use from the event loop only, it is
+    not thread-safe. """
+
+    def __init__(
+            self,
+            max_size: int
+    ) -> None:
+        self.max_size = max_size
+        self.entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(
+            self,
+            key: Hashable
+    ) -> Any | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        deadline, value = entry
+        if deadline <= time.monotonic():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    def set(
+            self,
+            key: Hashable,
+            value: Any,
+            ttl: float
+    ) -> None:
+        if ttl <= 0:
+            return
+
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def delete(
+            self,
+            key: Hashable
+    ) -> None:
+        self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.entries.clear()
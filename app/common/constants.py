@@ -1,14 +1,120 @@
+# Each search operator is matched by one named alternative of a single
+# tokenizer regex, so group names must be unique across all patterns.
 PATTERNS = {
-    "tags": r"(-)?\[(.*?)]",
-    "strict": r"(title|body)?:?\"(.*?)\"",
+    "tag": r"(?P<tag_negation>-)?\[(?P<tag_name>.*?)]",
+    "phrase": r"(?P<phrase_field>title|body)?:?\"(?P<phrase_text>.*?)\"",
     "score": r"score:"
              r"(?P<min_score>-?\d+)?"
-             r"(?P<operator>-|\.\.)?"
+             r"(?P<score_operator>-|\.\.)?"
              r"(?P<max_score>-?\d+)?",
-    "user": r"user:(\d+)",
-    "dates": r"(?P<field>created|lastactive):"
-             r"(?P<start_date>\d{4}(?:-\d{2}(?:-\d{2})?)?)"
-             r"(?P<operator>\.\.)?"
-             r"(?P<end_date>\d{4}(?:-\d{2}(?:-\d{2})?)?)?",
-    'booleans': r"(hasaccepted|isanswered):(true|false|yes|no|1|0)"
+    "user": r"user:(?P<user_id>\d+)",
+    "date": r"(?P<date_field>created|lastactive):"
+            r"(?P<start_date>\d{4}(?:-\d{2}(?:-\d{2})?)?)"
+            r"(?P<date_operator>\.\.)?"
+            r"(?P<end_date>\d{4}(?:-\d{2}(?:-\d{2})?)?)?",
+    "boolean": r"(?P<boolean_field>hasaccepted|isanswered):"
+               r"(?P<boolean_value>true|false|yes|no|1|0)"
 }
+
+TRUTHY_SEARCH_VALUES = {'true', 'yes', '1'}
+
+# Date formats of the created: and lastactive: operators by their length
+SEARCH_DATE_FORMATS = {4: '%Y', 7: '%Y-%m', 10: '%Y-%m-%d'}
+
+# Text search configuration used both by the generated tsvector columns,
+# including the migration creating them, and by the tsquery built from
+# the plain-text part of a search query. Existing databases need a
+# migration regenerating the columns when it changes.
+FULL_TEXT_SEARCH_CONFIG = 'english'
+
+# Relevance ranking adds the creation epoch divided by this scale, so a
+# question created a year later gains 0.1, while ts_rank_cd normalized
+# with flag 32 stays below 1.
+RELEVANCE_RECENCY_SCALE = 10 * 365 * 24 * 60 * 60
+
+SEARCH_CACHE_NAMESPACE = 'search'
+
+# Question scores are versioned apart from the rest of the searchable
+# content, so a vote only invalidates the searches that read the score:
+# the score and relevance orderings and the score filters.
+SEARCH_SCORE_CACHE_NAMESPACE = 'search:score'
+
+# Question detail responses are versioned per question under
+# '{QUESTION_CACHE_NAMESPACE}:{question_id}'
+QUESTION_CACHE_NAMESPACE = 'question'
+
+# Authenticated principals are versioned globally under this namespace,
+# for role and permission changes, and per user under
+# '{PRINCIPAL_CACHE_NAMESPACE}:{external_id}'
+PRINCIPAL_CACHE_NAMESPACE = 'principal'
+
+# Token store keys, see AuthRepository. Legacy token lists were named
+# after the Keycloak user id, a UUID.
+AUTH_SESSIONS_KEY = 'auth:{user_id}:sessions'
+AUTH_SESSION_KEY = 'auth:{user_id}:session:{session_id}'
+LEGACY_TOKEN_LIST_KEY_PATTERN = '????????-????-????-????-????????????'
+
+# Bit of every permission in the permission masks of principals, keyed
+# by permission name. Route requirements are compiled against it, so
+# entries may be appended but never renumbered or reused. Only
+# registered permissions can be created, and the bits stored in the
+# database are checked against this registry at startup.
+PERMISSION_BIT_INDEXES = {
+    'read_any_question': 0,
+    'create_own_question': 1,
+    'update_own_question': 2,
+    'delete_own_question': 3,
+    'update_any_question': 4,
+    'delete_any_question': 5,
+    'read_any_answer': 6,
+    'create_own_answer': 7,
+    'update_own_answer': 8,
+    'delete_own_answer': 9,
+    'update_any_answer': 10,
+    'delete_any_answer': 11,
+    'read_any_comment': 12,
+    'create_own_comment': 13,
+    'update_own_comment': 14,
+    'delete_own_comment': 15,
+    'update_any_comment': 16,
+    'delete_any_comment': 17,
+    'upvote': 18,
+    'downvote': 19,
+    'create_permission': 20,
+    'attach_permission': 21,
+    'create_role': 22,
+    'attach_role': 23,
+    'ban_user': 24,
+    'unban_user': 25,
+    'create_tag': 26,
+    'delete_tag': 27
+}
+
+# Number of most frequent tags returned as search facets
+SEARCH_FACET_TAGS_LIMIT = 20
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Uploads are read and size-checked in chunks of this many bytes
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of the image formats recognized on upload. WebP is
+# detected separately, its signature is split around the file size.
+IMAGE_SIGNATURES = {
+    b'\xff\xd8\xff': 'jpeg',
+    b'\x89PNG\r\n\x1a\n': 'png',
+    b'GIF87a': 'gif',
+    b'GIF89a': 'gif'
+}
+
+# Square WebP variants generated for every uploaded avatar, in pixels
+AVATAR_VARIANT_SIZES = (32, 64, 256)
+AVATAR_LIST_VARIANT_SIZE = 32
+AVATAR_PROFILE_VARIANT_SIZE = 256
+
+# Maximum number of keys accepted by a single S3 DeleteObjects request
+S3_DELETE_OBJECTS_BATCH_SIZE = 1000
+
+# Storage prefixes swept for objects without a storage item
+STORAGE_GC_PREFIXES = ('avatars/',)
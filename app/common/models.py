@@ -1,4 +1,5 @@
-from sqlalchemy.orm import Mapped
+from sqlalchemy import ForeignKey, UniqueConstraint, String
+from sqlalchemy.orm import Mapped, mapped_column
 
 from app.common.models_mixins import int_pk, CreatedAtUpdatedAtMixin
 from app.core.adapters.postgres.postgres_adapter import Base
@@ -6,8 +7,25 @@ from app.core.adapters.postgres.postgres_adapter import Base
 
 class StorageItemModel(CreatedAtUpdatedAtMixin, Base):
     __tablename__ = 'storage_items'
+    __table_args__ = (
+        UniqueConstraint('parent_id', 'variant'),
+    )
 
     id: Mapped[int_pk]
     original_file_name: Mapped[str]
     stored_file_name: Mapped[str]
-    storage_path: Mapped[str]
+    storage_path: Mapped[str] = mapped_column(index=True)
+    # Derived items, such as resized images, point to the original
+    # upload and are removed along with it.
+    parent_id: Mapped[int | None] = mapped_column(
+        ForeignKey('storage_items.id', ondelete='CASCADE')
+    )
+    variant: Mapped[str | None]
+    # SHA-256 of the content of uploads stored under a content-addressed
+    # key. Identical uploads share one item, which is deleted along with
+    # its file once nothing references it anymore.
+    content_hash: Mapped[str | None] = mapped_column(String(64), unique=True)
+    reference_count: Mapped[int] = mapped_column(
+        default=1,
+        server_default='1'
+    )
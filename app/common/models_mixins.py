@@ -23,6 +23,15 @@ class CreatedAtMixin:
     )
 
 
+class VoteCountersMixin:
+    score: Mapped[int] = mapped_column(default=0, server_default='0')
+    upvote_count: Mapped[int] = mapped_column(default=0, server_default='0')
+    downvote_count: Mapped[int] = mapped_column(
+        default=0,
+        server_default='0'
+    )
+
+
 class SoftDeleteMixin:
     deleted_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True),
@@ -1 +1,2 @@
 from app.common.repositories.storage import StorageItemRepository
+from app.common.repositories.cache import CacheRepository
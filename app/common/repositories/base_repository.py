@@ -1,12 +1,14 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Annotated, Sequence, List
+from typing import Annotated, Sequence, List, Any, Callable
 
 from fastapi import HTTPException, Depends
-from sqlalchemy import select, update, insert, delete, Select
+from sqlalchemy import select, update, insert, delete, Select, tuple_, \
+    literal, DateTime, ColumnElement
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload, subqueryload
 
-from app.common.types import MODEL, SCHEMA
+from app.common.types import MODEL, SCHEMA, LoadStrategyEnum
 from app.core.adapters.postgres.postgres_adapter import get_session
 
 
@@ -42,6 +44,19 @@ class BaseRepository(ABC):
         """
         return select(self.model)
 
+    @staticmethod
+    def _get_loader(
+            strategy: LoadStrategyEnum
+    ) -> Callable:
+        """ Returns the loader option matching the loading strategy. """
+        match strategy:
+            case LoadStrategyEnum.joined:
+                return joinedload
+            case LoadStrategyEnum.subquery:
+                return subqueryload
+            case _:
+                return selectinload
+
     async def get_one(
             self,
             filters: dict
@@ -94,6 +109,50 @@ class BaseRepository(ABC):
         entities = entities.unique().all()
         return entities
 
+    @staticmethod
+    async def paginate_by_keyset(
+            stmt: Select,
+            order_by: List[ColumnElement],
+            cursor_values: List[Any] | None,
+            limit: int
+    ) -> Select:
+        """
+        Orders the statement descending by the given sort key and applies
+        keyset pagination to it.
+
+        Sort key expressions are expected to be numeric or datetimes, and
+        the last one must be unique (usually the primary key) so that the
+        order is total and pages are stable.
+        One extra row is requested, its presence tells the caller that
+        a next page exists.
+        """
+        if cursor_values is not None:
+            invalid_cursor_exception = HTTPException(
+                status_code=400,
+                detail='Invalid cursor'
+            )
+            if len(cursor_values) != len(order_by):
+                raise invalid_cursor_exception
+
+            bounds = []
+            for expression, value in zip(order_by, cursor_values):
+                try:
+                    if isinstance(expression.type, DateTime):
+                        value = datetime.fromisoformat(value)
+                    elif isinstance(value, bool) or not isinstance(
+                            value, (int, float)
+                    ):
+                        raise TypeError
+                except (TypeError, ValueError):
+                    raise invalid_cursor_exception
+                bounds.append(literal(value, type_=expression.type))
+
+            stmt = stmt.where(tuple_(*order_by) < tuple_(*bounds))
+
+        return stmt.order_by(
+            *(expression.desc() for expression in order_by)
+        ).limit(limit + 1)
+
     async def get_entity_if_exists(
             self,
             entity_id: int
@@ -0,0 +1,72 @@
+import json
+from typing import Annotated, Any
+
+from aioredis import Redis
+from fastapi import Depends
+
+from app.core.adapters.redis.redis_adapter import get_session
+
+
+class CacheRepository:
+    """ Generic Redis cache of JSON values.
+    Entries are invalidated through per-namespace generation counters:
+    a key built with the current generation becomes unreachable as soon
+    as the generation is bumped, and is then reclaimed by its TTL. """
+
+    def __init__(
+            self,
+            redis: Annotated[Redis, Depends(get_session)]
+    ) -> None:
+        self.redis = redis
+
+    async def get_generation(
+            self,
+            namespace: str
+    ) -> int:
+        generation = await self.redis.get(f'{namespace}:generation')
+        return int(generation) if generation else 0
+
+    async def get_generations(
+            self,
+            namespaces: list[str]
+    ) -> list[int]:
+        generations = await self.redis.mget(
+            [f'{namespace}:generation' for namespace in namespaces]
+        )
+        return [
+            int(generation) if generation else 0
+            for generation in generations
+        ]
+
+    async def bump_generation(
+            self,
+            namespace: str
+    ) -> int:
+        return await self.redis.incr(f'{namespace}:generation')
+
+    async def bump_generations(
+            self,
+            namespaces: list[str]
+    ) -> None:
+        if not namespaces:
+            return
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for namespace in namespaces:
+                pipe.incr(f'{namespace}:generation')
+            await pipe.execute()
+
+    async def get_json(
+            self,
+            key: str
+    ) -> Any | None:
+        value = await self.redis.get(key)
+        return json.loads(value) if value is not None else None
+
+    async def set_json(
+            self,
+            key: str,
+            value: Any,
+            ttl: int
+    ) -> bool:
+        return await self.redis.set(key, json.dumps(value), ex=ttl)
@@ -1,6 +1,189 @@
+from datetime import datetime
+from typing import Sequence
+
+from sqlalchemy import select, or_, and_, update, delete, literal_column, \
+    Boolean
+from sqlalchemy.dialects.postgresql import insert
+
 from app.common.models import StorageItemModel
+from app.common.schemas import StorageItemCreateSchema
 from app.common.repositories.base_repository import BaseRepository
 
 
 class StorageItemRepository(BaseRepository):
     model = StorageItemModel
+
+    async def get_by_ids(
+            self,
+            item_ids: list[int]
+    ) -> Sequence[StorageItemModel]:
+        if not item_ids:
+            return []
+
+        items = await self.session.scalars(
+            select(self.model).where(self.model.id.in_(item_ids))
+        )
+        return items.all()
+
+    async def get_by_ids_with_variant(
+            self,
+            item_ids: list[int],
+            variant: str
+    ) -> Sequence[StorageItemModel]:
+        """
+        Returns the given items along with their variant of the given
+        name, when it exists, in a single query.
+        """
+        if not item_ids:
+            return []
+
+        items = await self.session.scalars(
+            select(self.model).where(
+                or_(
+                    self.model.id.in_(item_ids),
+                    and_(
+                        self.model.parent_id.in_(item_ids),
+                        self.model.variant == variant
+                    )
+                )
+            )
+        )
+        return items.all()
+
+    async def get_variants(
+            self,
+            parent_id: int
+    ) -> Sequence[StorageItemModel]:
+        items = await self.session.scalars(
+            select(self.model).filter_by(parent_id=parent_id)
+        )
+        return items.all()
+
+    async def get_by_content_hash(
+            self,
+            content_hash: str
+    ) -> StorageItemModel | None:
+        return await self.session.scalar(
+            select(self.model).filter_by(content_hash=content_hash)
+        )
+
+    async def increment_reference_count(
+            self,
+            item_id: int
+    ) -> bool:
+        """
+        Takes one more reference to the item. Returns False when the item
+        no longer exists, e.g. when it was collected in the meantime.
+        """
+        referenced_item_id = await self.session.scalar(
+            update(self.model).where(self.model.id == item_id).values(
+                reference_count=self.model.reference_count + 1
+            ).returning(self.model.id)
+        )
+        await self.session.commit()
+
+        return referenced_item_id is not None
+
+    async def create_or_reference(
+            self,
+            item: StorageItemCreateSchema
+    ) -> tuple[int, bool]:
+        """
+        Inserts a content-addressed item or, when an item with the same
+        content hash already exists, takes one more reference to it.
+        Returns the item id and whether the item was created.
+        """
+        stmt = insert(self.model).values(
+            **item.model_dump()
+        ).on_conflict_do_update(
+            index_elements=[self.model.content_hash],
+            set_={'reference_count': self.model.reference_count + 1}
+        ).returning(
+            self.model.id,
+            # xmax is only zero for rows that were freshly inserted
+            literal_column('xmax = 0', Boolean).label('is_created')
+        )
+        result = await self.session.execute(stmt)
+        item_id, is_created = result.one()
+        await self.session.commit()
+
+        return item_id, is_created
+
+    async def release(
+            self,
+            item_id: int
+    ) -> bool:
+        """
+        Drops one reference to the item and deletes it once no reference
+        is left. Returns whether the item was deleted, in which case the
+        caller is responsible for its files.
+        """
+        await self.session.execute(
+            update(self.model).where(self.model.id == item_id).values(
+                reference_count=self.model.reference_count - 1
+            )
+        )
+        deleted_item_id = await self.session.scalar(
+            delete(self.model).where(
+                self.model.id == item_id,
+                self.model.reference_count <= 0
+            ).returning(self.model.id)
+        )
+        await self.session.commit()
+
+        return deleted_item_id is not None
+
+    async def delete_unreferenced(
+            self,
+            created_before: datetime,
+            limit: int
+    ) -> list[str]:
+        """
+        Deletes up to limit original items created before the given time
+        whose reference count dropped to zero, along with their variants.
+        Returns the storage paths of all the deleted items.
+
+        The reference count is the source of truth, a reference is taken
+        before the user is updated. A concurrent increment_reference_count
+        either runs first, and the locking read skips the item since its
+        count is positive again, or waits for this transaction and then
+        finds no row, in which case its caller creates the item anew.
+        """
+        orphan_ids = await self.session.scalars(
+            select(self.model.id).where(
+                self.model.parent_id.is_(None),
+                self.model.created_at < created_before,
+                self.model.reference_count <= 0
+            ).limit(limit).with_for_update(skip_locked=True)
+        )
+        orphan_ids = orphan_ids.all()
+        if not orphan_ids:
+            await self.session.commit()
+            return []
+
+        storage_paths = await self.session.scalars(
+            delete(self.model).where(
+                or_(
+                    self.model.id.in_(orphan_ids),
+                    self.model.parent_id.in_(orphan_ids)
+                )
+            ).returning(self.model.storage_path)
+        )
+        storage_paths = storage_paths.all()
+        await self.session.commit()
+
+        return storage_paths
+
+    async def get_existing_storage_paths(
+            self,
+            storage_paths: list[str]
+    ) -> set[str]:
+        if not storage_paths:
+            return set()
+
+        existing_paths = await self.session.scalars(
+            select(self.model.storage_path).where(
+                self.model.storage_path.in_(storage_paths)
+            )
+        )
+        return set(existing_paths.all())
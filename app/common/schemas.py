@@ -1,5 +1,10 @@
+import datetime
+from typing import Generic, Literal
+
 from pydantic import BaseModel
 
+from app.common.types import SCHEMA
+
 
 class StorageItemBaseSchema(BaseModel):
     original_file_name: str
@@ -8,3 +13,48 @@ class StorageItemBaseSchema(BaseModel):
 class StorageItemCreateSchema(StorageItemBaseSchema):
     stored_file_name: str
     storage_path: str
+    parent_id: int | None = None
+    variant: str | None = None
+    content_hash: str | None = None
+
+
+class CursorPageOutSchema(BaseModel, Generic[SCHEMA]):
+    items: list[SCHEMA]
+    next_cursor: str | None = None
+
+
+class SearchTagTermSchema(BaseModel):
+    name: str
+    is_negative: bool = False
+
+
+class SearchPhraseTermSchema(BaseModel):
+    text: str
+    # None matches the phrase anywhere: title, body or answers
+    field: Literal['title', 'body'] | None = None
+
+
+class SearchScoreRangeSchema(BaseModel):
+    min_score: int | None = None
+    max_score: int | None = None
+
+
+class SearchDateRangeSchema(BaseModel):
+    field: Literal['created', 'lastactive']
+    start_date: datetime.datetime
+    end_date: datetime.datetime | None = None
+
+
+class SearchBooleanTermSchema(BaseModel):
+    field: Literal['hasaccepted', 'isanswered']
+    value: bool
+
+
+class SearchQuerySchema(BaseModel):
+    tags: list[SearchTagTermSchema] = []
+    phrases: list[SearchPhraseTermSchema] = []
+    scores: list[SearchScoreRangeSchema] = []
+    users: list[int] = []
+    dates: list[SearchDateRangeSchema] = []
+    booleans: list[SearchBooleanTermSchema] = []
+    plain_text: str = ''
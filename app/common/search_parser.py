@@ -0,0 +1,95 @@
+import re
+from datetime import datetime
+
+from fastapi import HTTPException
+
+from app.common.constants import PATTERNS, SEARCH_DATE_FORMATS, \
+    TRUTHY_SEARCH_VALUES
+from app.common.schemas import SearchQuerySchema, SearchTagTermSchema, \
+    SearchPhraseTermSchema, SearchScoreRangeSchema, SearchDateRangeSchema, \
+    SearchBooleanTermSchema
+
+# Compiled once at import time. Alternatives are tried in the order of
+# PATTERNS at every position, so each character of the query belongs to
+# at most one operator and the query is scanned exactly once.
+SEARCH_TOKEN_REGEX = re.compile(
+    '|'.join(f'(?P<{name}>{pattern})' for name, pattern in PATTERNS.items())
+)
+
+
+def parse_date(
+        date_str: str
+) -> datetime:
+    try:
+        return datetime.strptime(date_str, SEARCH_DATE_FORMATS[len(date_str)])
+    except (KeyError, ValueError):
+        raise HTTPException(
+            status_code=400,
+            detail='Invalid date format'
+        )
+
+
+def parse_search_query(
+        query: str
+) -> SearchQuerySchema:
+    parsed_query = SearchQuerySchema()
+    plain_text_parts = []
+    position = 0
+
+    for match in SEARCH_TOKEN_REGEX.finditer(query):
+        plain_text_parts.append(query[position:match.start()])
+        position = match.end()
+
+        # The outer named group closes last, so lastgroup is the operator
+        match match.lastgroup:
+            case 'tag':
+                parsed_query.tags.append(
+                    SearchTagTermSchema(
+                        name=match['tag_name'],
+                        is_negative=match['tag_negation'] is not None
+                    )
+                )
+            case 'phrase':
+                parsed_query.phrases.append(
+                    SearchPhraseTermSchema(
+                        text=match['phrase_text'],
+                        field=match['phrase_field']
+                    )
+                )
+            case 'score':
+                min_score = match['min_score']
+                max_score = match['max_score']
+                if min_score is None and max_score is None:
+                    continue
+                # Without a range operator a single value is a lower bound
+                if match['score_operator'] is None:
+                    max_score = None
+                parsed_query.scores.append(
+                    SearchScoreRangeSchema(
+                        min_score=min_score,
+                        max_score=max_score
+                    )
+                )
+            case 'user':
+                parsed_query.users.append(int(match['user_id']))
+            case 'date':
+                end_date = match['end_date']
+                parsed_query.dates.append(
+                    SearchDateRangeSchema(
+                        field=match['date_field'],
+                        start_date=parse_date(match['start_date']),
+                        end_date=parse_date(end_date) if end_date else None
+                    )
+                )
+            case 'boolean':
+                parsed_query.booleans.append(
+                    SearchBooleanTermSchema(
+                        field=match['boolean_field'],
+                        value=match['boolean_value'] in TRUTHY_SEARCH_VALUES
+                    )
+                )
+
+    plain_text_parts.append(query[position:])
+    parsed_query.plain_text = ' '.join(''.join(plain_text_parts).split())
+
+    return parsed_query
@@ -1,15 +1,25 @@
+import asyncio
+import time
+
+import jwt
 from fastapi import HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from keycloak import KeycloakPostError, KeycloakAuthenticationError
+from keycloak import KeycloakPostError, KeycloakAuthenticationError, \
+    KeycloakError
 
 from app.auth.schemas import TokenBaseSchema, DecodedTokenBaseSchema
-from app.dependencies import keycloak_openid, keycloak_admin
+from app.dependencies import keycloak_openid, keycloak_admin, get_settings
 from app.users.schemas import UserCreateSchema
 
 
 class KeycloakService:
     keycloak_openid = keycloak_openid
     keycloak_admin = keycloak_admin
+    # Realm signing keys by kid, as (key, algorithm).
+    signing_keys: dict[str, tuple[jwt.PyJWK, str]] = {}
+    signing_keys_fetched_at: float | None = None
+    signing_keys_refreshed_at: float | None = None
+    signing_keys_lock = asyncio.Lock()
 
     @classmethod
     async def create_user(
@@ -55,12 +65,118 @@ class KeycloakService:
                 detail='Invalid user credentials'
             )
 
+    @classmethod
+    def set_signing_keys(
+            cls,
+            jwks: dict
+    ) -> None:
+        """
+        Replaces the cached signing keys with the given JWK set. Keys
+        which are not for signatures or have an unsupported algorithm,
+        e.g. the realm encryption key, are skipped. A static key set can
+        be installed this way to verify tokens without Keycloak.
+        """
+        signing_keys = {}
+        for key_data in jwks.get('keys', []):
+            if key_data.get('use', 'sig') != 'sig':
+                continue
+            algorithm = key_data.get('alg', 'RS256')
+            try:
+                signing_keys[key_data['kid']] = (
+                    jwt.PyJWK(key_data, algorithm),
+                    algorithm
+                )
+            except (KeyError, jwt.PyJWTError):
+                continue
+
+        cls.signing_keys = signing_keys
+        cls.signing_keys_fetched_at = time.monotonic()
+
+    @classmethod
+    async def refresh_signing_keys(
+            cls
+    ) -> None:
+        """
+        Fetches the realm JWK set. Refreshes are serialized and happen
+        at most once per KEYCLOAK_JWKS_REFRESH_INTERVAL, so that tokens
+        with unknown kids can't flood Keycloak. If Keycloak can't be
+        reached the cached keys are kept.
+        """
+        settings = get_settings()
+        async with cls.signing_keys_lock:
+            if (
+                    cls.signing_keys_refreshed_at is not None
+                    and time.monotonic() - cls.signing_keys_refreshed_at
+                    < settings.KEYCLOAK_JWKS_REFRESH_INTERVAL
+            ):
+                return
+            cls.signing_keys_refreshed_at = time.monotonic()
+
+            try:
+                jwks = await cls.keycloak_openid.a_certs()
+            except KeycloakError:
+                return
+            cls.set_signing_keys(jwks)
+
+    @classmethod
+    async def get_signing_key(
+            cls,
+            kid: str | None
+    ) -> tuple[jwt.PyJWK, str]:
+        """
+        Returns the cached signing key with the given kid. The key set is
+        refreshed when it is older than KEYCLOAK_JWKS_TTL or the kid is
+        unknown, which picks up rotated keys.
+        """
+        settings = get_settings()
+        if (
+                cls.signing_keys_fetched_at is None
+                or time.monotonic() - cls.signing_keys_fetched_at
+                > settings.KEYCLOAK_JWKS_TTL
+                or kid not in cls.signing_keys
+        ):
+            await cls.refresh_signing_keys()
+
+        signing_key = cls.signing_keys.get(kid)
+        if signing_key is None:
+            raise jwt.InvalidKeyError('Unknown signing key')
+        return signing_key
+
+    @staticmethod
+    def get_issuer() -> str:
+        settings = get_settings()
+        if settings.KEYCLOAK_ISSUER:
+            return settings.KEYCLOAK_ISSUER
+        server_url = settings.KEYCLOAK_SERVER_URL.rstrip('/')
+        return f'{server_url}/realms/{settings.KEYCLOAK_REALM}'
+
     @classmethod
     async def decode_token(
             cls,
             token: str
     ) -> DecodedTokenBaseSchema:
-        decoded = await cls.keycloak_openid.a_decode_token(token)
+        """
+        Verifies the token locally against the cached realm keys.
+        The token has to be issued by the realm for KEYCLOAK_CLIENT_ID.
+        Raises jwt.PyJWTError if the token is invalid.
+        """
+        settings = get_settings()
+        header = jwt.get_unverified_header(token)
+        signing_key, algorithm = await cls.get_signing_key(header.get('kid'))
+        # Keycloak names the client a token was issued for in azp, aud
+        # lists the services it grants access to, usually just 'account'.
+        decoded = jwt.decode(
+            token,
+            signing_key.key,
+            algorithms=[algorithm],
+            issuer=cls.get_issuer(),
+            options={
+                'verify_aud': False,
+                'require': ['exp', 'iss', 'sub', 'azp']
+            }
+        )
+        if decoded['azp'] != settings.KEYCLOAK_CLIENT_ID:
+            raise jwt.InvalidAudienceError('Token is for another client')
         return DecodedTokenBaseSchema.model_validate(decoded)
 
     @classmethod
@@ -1,10 +1,13 @@
-import re
+import hashlib
+import json
 from typing import Annotated
 
 from fastapi import Depends
 
 from app.answers.repositories import AnswerRepository
-from app.common.constants import PATTERNS
+from app.common.schemas import SearchQuerySchema, SearchTagTermSchema, \
+    SearchPhraseTermSchema
+from app.common.search_parser import parse_search_query
 from app.questions.repositories import QuestionRepository
 from app.votes.repository import VoteRepository
 
@@ -23,41 +26,45 @@ class SearchService:
     @staticmethod
     async def parse_query(
             query: str
-    ) -> dict:
+    ) -> SearchQuerySchema:
+        return parse_search_query(query)
 
-        tags_regex = re.compile(PATTERNS["tags"])
-        tags = tags_regex.findall(query)
-
-        strict_regex = re.compile(PATTERNS["strict"])
-        strict_text = strict_regex.findall(query)
-
-        score_regex = re.compile(PATTERNS["score"])
-        # Extracting the named groups (min_score, operator, max_score)
-        # from each match
-        scores = [match for match in score_regex.finditer(query)]
-
-        user_regex = re.compile(PATTERNS["user"])
-        users = user_regex.findall(query)
-
-        date_regex = re.compile(PATTERNS["dates"])
-        # Extracting the named groups (field, start_date, operator, end_date)
-        # from each match
-        date = [match for match in date_regex.finditer(query)]
-
-        boolean_regex = re.compile(PATTERNS["booleans"])
-        booleans = boolean_regex.findall(query)
-
-        for pattern in PATTERNS.values():
-            query = re.sub(pattern, "", query)
-
-        plain_text = query.strip()
-
-        return {
-            "tags": tags,
-            "strict_text": strict_text,
-            "scores": scores,
-            "plain_text": plain_text,
-            "users": users,
-            "dates": date,
-            "booleans": booleans
+    @staticmethod
+    async def get_query_cache_key(
+            parsed_query: SearchQuerySchema
+    ) -> str:
+        """
+        Returns a digest of the canonical form of a parsed query, so that
+        queries differing only in term order, letter case of the
+        case-insensitive terms or whitespace share one cache entry.
+        """
+        canonical_query = {
+            'tags': sorted(
+                SearchTagTermSchema(
+                    name=tag.name.lower(),
+                    is_negative=tag.is_negative
+                ).model_dump_json()
+                for tag in parsed_query.tags
+            ),
+            'phrases': sorted(
+                SearchPhraseTermSchema(
+                    text=phrase.text.lower(),
+                    field=phrase.field
+                ).model_dump_json()
+                for phrase in parsed_query.phrases
+            ),
+            'scores': sorted(
+                score.model_dump_json() for score in parsed_query.scores
+            ),
+            'users': sorted(parsed_query.users),
+            'dates': sorted(
+                date.model_dump_json() for date in parsed_query.dates
+            ),
+            'booleans': sorted(
+                boolean.model_dump_json() for boolean in parsed_query.booleans
+            ),
+            'plain_text': parsed_query.plain_text.lower()
         }
+        return hashlib.sha256(
+            json.dumps(canonical_query, sort_keys=True).encode()
+        ).hexdigest()
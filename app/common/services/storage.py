@@ -1,13 +1,30 @@
+import hashlib
+import io
+import tempfile
 import uuid
+from typing import BinaryIO
 
+from PIL import Image, ImageOps
 from boto3.exceptions import Boto3Error
+from botocore.exceptions import BotoCoreError, ClientError
 from fastapi import UploadFile, HTTPException
 
+from app.common.caches import TTLCache
+from app.common.constants import UPLOAD_CHUNK_SIZE
+from app.common.utils import sniff_image_type
 from app.core.adapters.aws_s3.aws_s3_adapter import s3_client
+from app.core.adapters.redis.redis_adapter import session as redis_session
+from app.dependencies import get_settings
+
+settings = get_settings()
 
 
 class StorageItemService:
     s3_client = s3_client
+    # Presigned URLs by (bucket, key). Entries are dropped
+    # PRESIGNED_URL_EXPIRY_MARGIN seconds before the URL expires, so a
+    # served URL always stays valid long enough to be fetched.
+    presigned_url_cache = TTLCache(settings.PRESIGNED_URL_CACHE_SIZE)
 
     @classmethod
     async def upload_file(
@@ -22,12 +39,12 @@ class StorageItemService:
         stored_file_path = f'{item_path}/{stored_file_name}'
 
         try:
-            cls.s3_client.upload_fileobj(
+            await cls.s3_client.upload_fileobj(
                 file.file,
                 bucket_name,
                 stored_file_path
             )
-        except Boto3Error:
+        except (Boto3Error, BotoCoreError, ClientError):
             raise HTTPException(
                 status_code=500,
                 detail='Error uploading file'
@@ -35,19 +52,227 @@ class StorageItemService:
 
         return stored_file_path
 
+    @staticmethod
+    def __is_image_too_large(
+            image: Image.Image
+    ) -> bool:
+        width, height = image.size
+        return width * height > settings.MAX_IMAGE_PIXELS
+
+    @classmethod
+    async def read_image(
+            cls,
+            file: UploadFile,
+            max_size: int
+    ) -> tuple[BinaryIO, str, str]:
+        """
+        Streams an uploaded image into a spooled buffer in chunks,
+        rejecting it as soon as it exceeds max_size bytes or when its
+        leading bytes do not match one of ALLOWED_IMAGE_TYPES. The byte
+        limit only bounds the compressed size, so the dimensions read from
+        the image header are checked against MAX_IMAGE_PIXELS as well,
+        without decoding the pixels.
+        Returns the rewound buffer, which the caller has to close, the
+        detected image type and the SHA-256 hex digest of the content,
+        computed along the way.
+        """
+        too_large_exception = HTTPException(
+            status_code=413,
+            detail='File is too large'
+        )
+        if file.size is not None and file.size > max_size:
+            raise too_large_exception
+
+        buffer = tempfile.SpooledTemporaryFile(
+            max_size=UPLOAD_CHUNK_SIZE * 16
+        )
+        digest = hashlib.sha256()
+        image_type = None
+        size = 0
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if image_type is None:
+                    image_type = sniff_image_type(chunk)
+                    if image_type not in settings.ALLOWED_IMAGE_TYPES:
+                        raise HTTPException(
+                            status_code=415,
+                            detail='Unsupported image type'
+                        )
+                size += len(chunk)
+                if size > max_size:
+                    raise too_large_exception
+                digest.update(chunk)
+                buffer.write(chunk)
+
+            if image_type is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail='File is empty'
+                )
+
+            buffer.seek(0)
+            try:
+                with Image.open(buffer) as image:
+                    is_too_large = cls.__is_image_too_large(image)
+            except Image.DecompressionBombError:
+                is_too_large = True
+            except OSError:
+                raise HTTPException(
+                    status_code=400,
+                    detail='Invalid image'
+                )
+            if is_too_large:
+                raise HTTPException(
+                    status_code=413,
+                    detail='Image dimensions are too large'
+                )
+        except HTTPException:
+            buffer.close()
+            raise
+
+        buffer.seek(0)
+        return buffer, image_type, digest.hexdigest()
+
+    @classmethod
+    async def upload_image(
+            cls,
+            bucket_name: str,
+            storage_path: str,
+            buffer: BinaryIO,
+            image_type: str
+    ) -> str:
+        try:
+            await cls.s3_client.upload_fileobj(
+                buffer,
+                bucket_name,
+                storage_path,
+                {'ContentType': f'image/{image_type}'}
+            )
+        except (Boto3Error, BotoCoreError, ClientError):
+            raise HTTPException(
+                status_code=500,
+                detail='Error uploading file'
+            )
+
+        return storage_path
+
+    @staticmethod
+    def get_image_variant_name(
+            size: int
+    ) -> str:
+        return f'webp_{size}'
+
+    @classmethod
+    async def generate_image_variants(
+            cls,
+            bucket_name: str,
+            storage_path: str,
+            sizes: tuple[int, ...]
+    ) -> dict[int, str]:
+        """
+        Stores square WebP thumbnails of a stored image next to it.
+        Returns the storage paths of the thumbnails by their size, none
+        for an image with more than MAX_IMAGE_PIXELS pixels, which is
+        checked before the pixels are decoded.
+        """
+        original = io.BytesIO()
+        await cls.s3_client.download_fileobj(
+            bucket_name,
+            storage_path,
+            original
+        )
+        original.seek(0)
+
+        with Image.open(original) as image:
+            if cls.__is_image_too_large(image):
+                return {}
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA')
+
+            storage_path_stem = storage_path.rsplit('.', 1)[0]
+            variant_paths = {}
+            for size in sizes:
+                variant = io.BytesIO()
+                ImageOps.fit(
+                    image,
+                    (size, size),
+                    Image.Resampling.LANCZOS
+                ).save(variant, 'WEBP', quality=80, method=4)
+                variant.seek(0)
+
+                variant_path = f'{storage_path_stem}_{size}.webp'
+                await cls.s3_client.upload_fileobj(
+                    variant,
+                    bucket_name,
+                    variant_path,
+                    {'ContentType': 'image/webp'}
+                )
+                variant_paths[size] = variant_path
+
+        return variant_paths
+
+    @staticmethod
+    def __get_presigned_url_redis_key(
+            bucket_name: str,
+            storage_path: str
+    ) -> str:
+        return f'presigned_url:{bucket_name}:{storage_path}'
+
     @classmethod
     async def generate_presigned_url(
             cls,
             bucket_name: str,
             storage_path: str
     ) -> str:
-        return cls.s3_client.generate_presigned_url(
-            'get_object',
-            Params={
-                'Bucket': bucket_name,
-                'Key': storage_path
-            }
+        cache_key = (bucket_name, storage_path)
+        presigned_url = cls.presigned_url_cache.get(cache_key)
+        if presigned_url is not None:
+            return presigned_url
+
+        redis_key = cls.__get_presigned_url_redis_key(
+            bucket_name,
+            storage_path
         )
+        if settings.PRESIGNED_URL_SHARED_CACHE:
+            async with redis_session.pipeline(transaction=False) as pipe:
+                presigned_url, ttl = await (
+                    pipe.get(redis_key).ttl(redis_key).execute()
+                )
+            if presigned_url is not None:
+                presigned_url = presigned_url.decode()
+                cls.presigned_url_cache.set(cache_key, presigned_url, ttl)
+                return presigned_url
+
+        presigned_url = await cls.s3_client.generate_presigned_url(
+            bucket_name,
+            storage_path,
+            settings.PRESIGNED_URL_EXPIRES_IN
+        )
+
+        ttl = (
+            settings.PRESIGNED_URL_EXPIRES_IN
+            - settings.PRESIGNED_URL_EXPIRY_MARGIN
+        )
+        cls.presigned_url_cache.set(cache_key, presigned_url, ttl)
+        if settings.PRESIGNED_URL_SHARED_CACHE and ttl > 0:
+            await redis_session.set(redis_key, presigned_url, ex=ttl)
+
+        return presigned_url
+
+    @classmethod
+    async def generate_presigned_urls(
+            cls,
+            bucket_name: str,
+            storage_paths: list[str]
+    ) -> dict[str, str]:
+        return {
+            storage_path: await cls.generate_presigned_url(
+                bucket_name,
+                storage_path
+            )
+            for storage_path in set(storage_paths)
+        }
 
     @classmethod
     async def delete_file(
@@ -56,11 +281,50 @@ class StorageItemService:
             storage_path: str
     ) -> bool:
         try:
-            cls.s3_client.delete_object(
-                Bucket=bucket_name,
-                Key=storage_path
+            await cls.s3_client.delete_object(
+                bucket_name,
+                storage_path
             )
-        except Boto3Error:
+        except (Boto3Error, BotoCoreError, ClientError):
             return False
 
+        cls.presigned_url_cache.delete((bucket_name, storage_path))
+        if settings.PRESIGNED_URL_SHARED_CACHE:
+            await redis_session.delete(
+                cls.__get_presigned_url_redis_key(bucket_name, storage_path)
+            )
+
         return True
+
+    @classmethod
+    async def delete_files(
+            cls,
+            bucket_name: str,
+            storage_paths: list[str]
+    ) -> list[str]:
+        """
+        Deletes the files in bulk and returns the paths of those that
+        could not be deleted.
+        """
+        try:
+            failed_paths = await cls.s3_client.delete_objects(
+                bucket_name,
+                storage_paths
+            )
+        except (Boto3Error, BotoCoreError, ClientError):
+            return storage_paths
+
+        for storage_path in storage_paths:
+            cls.presigned_url_cache.delete((bucket_name, storage_path))
+        if settings.PRESIGNED_URL_SHARED_CACHE and storage_paths:
+            await redis_session.delete(
+                *(
+                    cls.__get_presigned_url_redis_key(
+                        bucket_name,
+                        storage_path
+                    )
+                    for storage_path in storage_paths
+                )
+            )
+
+        return failed_paths
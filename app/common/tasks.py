@@ -1,8 +1,18 @@
 import asyncio
+from datetime import datetime, timedelta, timezone
 
-from app.common.services import ReportService, EmailService
+from sqlalchemy.exc import IntegrityError
+
+from app.auth.repositories import AuthRepository
+from app.common.constants import AVATAR_VARIANT_SIZES, STORAGE_GC_PREFIXES
+from app.common.repositories import StorageItemRepository
+from app.common.schemas import StorageItemCreateSchema
+from app.common.services import ReportService, EmailService, \
+    StorageItemService
 from app.core.adapters.celery.celery_adapter import celery_app
 from app.core.adapters.postgres.postgres_adapter import async_session
+from app.core.adapters.redis.redis_adapter import session as redis_session
+from app.dependencies import get_settings
 from app.questions.repositories import QuestionRepository
 from app.tags.repositories import TagRepository
 from app.users.repositories import UserRepository
@@ -27,3 +37,191 @@ async def generate_and_send_report() -> None:
 def generate_and_send_report_task() -> None:
     loop = asyncio.get_event_loop()
     loop.run_until_complete(generate_and_send_report())
+
+
+async def generate_avatar_variants(
+        storage_item_id: int
+) -> None:
+    settings = get_settings()
+
+    async with async_session() as session:
+        storage_item_repository = StorageItemRepository(session)
+        item_model = await storage_item_repository.get_by_id(
+            storage_item_id
+        )
+        # The avatar was released before the task ran, or its variants
+        # were already generated by a previous run.
+        if not item_model or await storage_item_repository.get_variants(
+                item_model.id
+        ):
+            return
+
+        variant_paths = await StorageItemService.generate_image_variants(
+            settings.AWS_BUCKET_NAME,
+            item_model.storage_path,
+            AVATAR_VARIANT_SIZES
+        )
+        if not variant_paths:
+            return
+
+        try:
+            await storage_item_repository.create_many(
+                [
+                    StorageItemCreateSchema(
+                        original_file_name=item_model.original_file_name,
+                        stored_file_name=variant_path.split('/')[-1],
+                        storage_path=variant_path,
+                        parent_id=item_model.id,
+                        variant=StorageItemService.get_image_variant_name(
+                            size
+                        )
+                    ).model_dump()
+                    for size, variant_path in variant_paths.items()
+                ]
+            )
+        except IntegrityError:
+            await session.rollback()
+            # Variant paths derive from the original one, so the files
+            # are only unreferenced when the original was deleted.
+            if await storage_item_repository.get_by_id(item_model.id):
+                return
+            for variant_path in variant_paths.values():
+                await StorageItemService.delete_file(
+                    settings.AWS_BUCKET_NAME,
+                    variant_path
+                )
+
+
+@celery_app.task()
+def generate_avatar_variants_task(
+        storage_item_id: int
+) -> None:
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(generate_avatar_variants(storage_item_id))
+
+
+async def release_storage_item(
+        storage_item_id: int
+) -> None:
+    settings = get_settings()
+
+    async with async_session() as session:
+        storage_item_repository = StorageItemRepository(session)
+        item_models = [
+            await storage_item_repository.get_by_id(storage_item_id),
+            *await storage_item_repository.get_variants(storage_item_id)
+        ]
+        if not await storage_item_repository.release(storage_item_id):
+            return
+
+    # Files left behind by a failure here are reclaimed by the next
+    # storage garbage collection. Storage keys are never reused, so an
+    # item re-created since does not share these files.
+    await StorageItemService.delete_files(
+        settings.AWS_BUCKET_NAME,
+        [item_model.storage_path for item_model in item_models]
+    )
+
+
+@celery_app.task()
+def release_storage_item_task(
+        storage_item_id: int
+) -> None:
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(release_storage_item(storage_item_id))
+
+
+async def collect_storage_garbage() -> dict[str, int]:
+    """
+    Removes storage items without references, with their files, and
+    then files that have no storage item.
+    Anything younger than STORAGE_GC_GRACE_PERIOD is kept, since an
+    upload is stored before the user it belongs to is updated.
+    """
+    settings = get_settings()
+    created_before = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.STORAGE_GC_GRACE_PERIOD
+    )
+    report = {
+        'deleted_items': 0,
+        'orphaned_files': 0,
+        'deleted_files': 0,
+        'failed_files': 0
+    }
+
+    async def delete_files(storage_paths: list[str]) -> None:
+        failed_paths = await StorageItemService.delete_files(
+            settings.AWS_BUCKET_NAME,
+            storage_paths
+        )
+        report['deleted_files'] += len(storage_paths) - len(failed_paths)
+        report['failed_files'] += len(failed_paths)
+
+    async with async_session() as session:
+        storage_item_repository = StorageItemRepository(session)
+
+        while storage_paths := await (
+                storage_item_repository.delete_unreferenced(
+                    created_before,
+                    settings.STORAGE_GC_BATCH_SIZE
+                )
+        ):
+            report['deleted_items'] += len(storage_paths)
+            await delete_files(storage_paths)
+
+        for prefix in STORAGE_GC_PREFIXES:
+            async for objects in StorageItemService.s3_client.iterate_objects(
+                    settings.AWS_BUCKET_NAME,
+                    prefix
+            ):
+                storage_paths = [
+                    obj['Key'] for obj in objects
+                    if obj['LastModified'] < created_before
+                ]
+                existing_paths = await (
+                    storage_item_repository.get_existing_storage_paths(
+                        storage_paths
+                    )
+                )
+                orphaned_paths = [
+                    storage_path for storage_path in storage_paths
+                    if storage_path not in existing_paths
+                ]
+                if orphaned_paths:
+                    report['orphaned_files'] += len(orphaned_paths)
+                    await delete_files(orphaned_paths)
+
+    return report
+
+
+@celery_app.task()
+def collect_storage_garbage_task() -> dict[str, int]:
+    loop = asyncio.get_event_loop()
+    return loop.run_until_complete(collect_storage_garbage())
+
+
+async def drain_legacy_token_lists() -> dict[str, int]:
+    """
+    Migrates every legacy token list into the session token store.
+    Returns the number of drained lists and of migrated tokens.
+    """
+    settings = get_settings()
+    auth_repository = AuthRepository(redis_session)
+    report = {'drained_lists': 0, 'migrated_tokens': 0}
+
+    async for user_id in auth_repository.iterate_legacy_token_lists():
+        report['migrated_tokens'] += await (
+            auth_repository.migrate_legacy_tokens(
+                user_id,
+                settings.AUTH_MAX_SESSIONS
+            )
+        )
+        report['drained_lists'] += 1
+
+    return report
+
+
+@celery_app.task()
+def drain_legacy_token_lists_task() -> dict[str, int]:
+    loop = asyncio.get_event_loop()
+    return loop.run_until_complete(drain_legacy_token_lists())
@@ -1,3 +1,4 @@
+from enum import Enum
 from typing import TypeVar
 
 from pydantic import BaseModel
@@ -5,3 +6,13 @@ from sqlalchemy.orm import DeclarativeMeta
 
 MODEL = TypeVar("MODEL", bound=DeclarativeMeta)
 SCHEMA = TypeVar('SCHEMA', bound=BaseModel)
+
+
+class LoadStrategyEnum(str, Enum):
+    """ Eager loading strategy of the collections of an entity tree.
+    joined adds the collections to the main statement as outer joins,
+    selectin and subquery load each collection with one more statement,
+    which avoids multiplying the rows of sibling collections. """
+    joined = 'joined'
+    selectin = 'selectin'
+    subquery = 'subquery'
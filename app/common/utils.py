@@ -1,7 +1,14 @@
+import base64
 import csv
+import json
 from io import StringIO
 from typing import List, Tuple, Any
 
+from fastapi import HTTPException
+
+from app.common.constants import IMAGE_SIGNATURES, QUESTION_CACHE_NAMESPACE, \
+    PRINCIPAL_CACHE_NAMESPACE, PERMISSION_BIT_INDEXES
+
 
 async def generate_csv(
         sections: List[Tuple[str, List[str], List[List[Any]]]]
@@ -20,3 +27,83 @@ async def generate_csv(
         csv_writer.writerow([])
 
     return csv_file.getvalue()
+
+
+# Cursors are opaque to clients: a url-safe base64 of the JSON list of
+# the sort key values of the last returned row.
+def encode_cursor(
+        values: List[Any]
+) -> str:
+    payload = json.dumps(
+        values,
+        default=lambda value: value.isoformat(),
+        separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(
+        cursor: str
+) -> List[Any]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(payload)
+    except ValueError:
+        values = None
+
+    if not isinstance(values, list):
+        raise HTTPException(
+            status_code=400,
+            detail='Invalid cursor'
+        )
+    return values
+
+
+def sniff_image_type(
+        header: bytes
+) -> str | None:
+    """ Detects the image format from the leading bytes of a file,
+    regardless of its name or the content type sent by the client. """
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    for signature, image_type in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return image_type
+    return None
+
+
+def get_question_cache_namespace(
+        question_id: int
+) -> str:
+    return f'{QUESTION_CACHE_NAMESPACE}:{question_id}'
+
+
+def get_principal_cache_namespace(
+        external_id: str
+) -> str:
+    return f'{PRINCIPAL_CACHE_NAMESPACE}:{external_id}'
+
+
+def get_permission_mask(
+        permission_names: set[str]
+) -> int:
+    """
+    Compiles permission names into a mask of their registered bits.
+    Raises KeyError for an unregistered name, so that a misspelled
+    route requirement fails at import time.
+    """
+    mask = 0
+    for permission_name in permission_names:
+        mask |= 1 << PERMISSION_BIT_INDEXES[permission_name]
+    return mask
+
+
+def etag_matches(
+        if_none_match: str | None,
+        etag: str
+) -> bool:
+    """ Evaluates an If-None-Match header against a strong ETag. """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates
@@ -1,12 +1,180 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, BinaryIO, Callable
+
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 
+from app.common.constants import S3_DELETE_OBJECTS_BATCH_SIZE
 from app.dependencies import get_settings
 
 settings = get_settings()
 
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    region_name=settings.AWS_REGION
+
+class AsyncS3Client:
+    """ Runs blocking boto3 calls in a bounded thread pool, so a slow
+    transfer never stalls the event loop.
+    The client, executor and transfer config are injectable, which allows
+    pointing the adapter to a local S3-compatible server in tests. """
+
+    def __init__(
+            self,
+            client: Any,
+            executor: ThreadPoolExecutor,
+            transfer_config: TransferConfig
+    ) -> None:
+        self.client = client
+        self.executor = executor
+        self.transfer_config = transfer_config
+
+    async def _run(
+            self,
+            func: Callable,
+            *args: Any,
+            **kwargs: Any
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(func, *args, **kwargs)
+        )
+
+    async def upload_fileobj(
+            self,
+            fileobj: BinaryIO,
+            bucket_name: str,
+            key: str,
+            extra_args: dict | None = None
+    ) -> None:
+        await self._run(
+            self.client.upload_fileobj,
+            fileobj,
+            bucket_name,
+            key,
+            ExtraArgs=extra_args,
+            Config=self.transfer_config
+        )
+
+    async def download_fileobj(
+            self,
+            bucket_name: str,
+            key: str,
+            fileobj: BinaryIO
+    ) -> None:
+        await self._run(
+            self.client.download_fileobj,
+            bucket_name,
+            key,
+            fileobj,
+            Config=self.transfer_config
+        )
+
+    async def delete_object(
+            self,
+            bucket_name: str,
+            key: str
+    ) -> dict:
+        return await self._run(
+            self.client.delete_object,
+            Bucket=bucket_name,
+            Key=key
+        )
+
+    async def delete_objects(
+            self,
+            bucket_name: str,
+            keys: list[str]
+    ) -> list[str]:
+        """
+        Deletes the keys with one DeleteObjects request per
+        S3_DELETE_OBJECTS_BATCH_SIZE keys, the maximum the API accepts.
+        Returns the keys that could not be deleted.
+        """
+        failed_keys = []
+        for start in range(0, len(keys), S3_DELETE_OBJECTS_BATCH_SIZE):
+            response = await self._run(
+                self.client.delete_objects,
+                Bucket=bucket_name,
+                Delete={
+                    'Objects': [
+                        {'Key': key} for key in
+                        keys[start:start + S3_DELETE_OBJECTS_BATCH_SIZE]
+                    ],
+                    'Quiet': True
+                }
+            )
+            failed_keys.extend(
+                error['Key'] for error in response.get('Errors', [])
+            )
+        return failed_keys
+
+    async def iterate_objects(
+            self,
+            bucket_name: str,
+            prefix: str
+    ) -> AsyncIterator[list[dict]]:
+        """ Yields the objects under the prefix one listing page at a time. """
+        kwargs = {'Bucket': bucket_name, 'Prefix': prefix}
+        while True:
+            response = await self._run(self.client.list_objects_v2, **kwargs)
+            yield response.get('Contents', [])
+            if not response.get('IsTruncated'):
+                return
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+    async def generate_presigned_url(
+            self,
+            bucket_name: str,
+            key: str,
+            expires_in: int
+    ) -> str:
+        # Signing is a local HMAC computation without network I/O,
+        # it is not worth a round trip through the executor.
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': bucket_name,
+                'Key': key
+            },
+            ExpiresIn=expires_in
+        )
+
+
+# Every executor thread may run a multipart transfer of its own, so the
+# connection pool is sized to fit all of their parts in flight.
+client_config = Config(
+    region_name=settings.AWS_REGION,
+    max_pool_connections=(
+        settings.AWS_S3_EXECUTOR_WORKERS
+        * settings.AWS_S3_TRANSFER_CONCURRENCY
+    ),
+    retries={
+        'max_attempts': settings.AWS_S3_MAX_ATTEMPTS,
+        'mode': 'standard'
+    },
+    connect_timeout=settings.AWS_S3_CONNECT_TIMEOUT,
+    read_timeout=settings.AWS_S3_READ_TIMEOUT
+)
+
+transfer_config = TransferConfig(
+    multipart_threshold=settings.AWS_S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=settings.AWS_S3_MULTIPART_CHUNKSIZE,
+    max_concurrency=settings.AWS_S3_TRANSFER_CONCURRENCY
+)
+
+s3_client = AsyncS3Client(
+    boto3.client(
+        's3',
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        endpoint_url=settings.AWS_S3_ENDPOINT_URL or None,
+        config=client_config
+    ),
+    ThreadPoolExecutor(
+        max_workers=settings.AWS_S3_EXECUTOR_WORKERS,
+        thread_name_prefix='s3'
+    ),
+    transfer_config
 )
@@ -44,5 +44,13 @@ celery_app.conf.beat_schedule = {
             day_of_month='*',
             month_of_year='*'
         )
+    },
+    'collect-storage-garbage': {
+        'task': 'app.common.tasks.collect_storage_garbage_task',
+        'schedule': crontab(minute='0', hour='4')
+    },
+    'drain-legacy-token-lists': {
+        'task': 'app.common.tasks.drain_legacy_token_lists_task',
+        'schedule': crontab(minute='30', hour='4')
     }
 }
@@ -1,4 +1,6 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
+from typing_extensions import Self
 
 
 class Settings(BaseSettings):
@@ -16,7 +18,19 @@ class Settings(BaseSettings):
     AWS_BUCKET_NAME: str
     AWS_REGION: str
     AWS_BUCKET_URL: str
+    AWS_S3_ENDPOINT_URL: str | None = None
+    AWS_S3_EXECUTOR_WORKERS: int = 8
+    AWS_S3_TRANSFER_CONCURRENCY: int = 4
+    AWS_S3_MAX_ATTEMPTS: int = 5
+    AWS_S3_CONNECT_TIMEOUT: int = 5
+    AWS_S3_READ_TIMEOUT: int = 30
+    AWS_S3_MULTIPART_THRESHOLD: int = 8 * 1024 * 1024
+    AWS_S3_MULTIPART_CHUNKSIZE: int = 8 * 1024 * 1024
     ALLOWED_IMAGE_TYPES: list[str]
+    MAX_AVATAR_SIZE: int = 5 * 1024 * 1024
+    MAX_IMAGE_PIXELS: int = 4096 * 4096
+    STORAGE_GC_GRACE_PERIOD: int = 24 * 60 * 60
+    STORAGE_GC_BATCH_SIZE: int = 1000
     KEYCLOAK_SERVER_URL: str
     KEYCLOAK_CLIENT_ID: str
     KEYCLOAK_CLIENT_SECRET: str
@@ -24,10 +38,37 @@ class Settings(BaseSettings):
     KEYCLOAK_ADMIN_CLIENT_SECRET: str
     KEYCLOAK_REALM: str
     KEYCLOAK_MASTER_REALM: str
+    # Issuer of the realm tokens, the realm URL on KEYCLOAK_SERVER_URL
+    # when unset. Set it when Keycloak issues tokens under another URL
+    # than the one the API reaches it at.
+    KEYCLOAK_ISSUER: str | None = None
+    KEYCLOAK_JWKS_TTL: int = 60 * 60
+    KEYCLOAK_JWKS_REFRESH_INTERVAL: int = 30
+    AUTH_MAX_SESSIONS: int = 10
     SUPERUSER_USERNAME: str
     SUPERUSER_PASSWORD: str
     SUPERUSER_EMAIL: str
     TIMEZONE: str
+    SEARCH_CACHE_TTL: int = 60
+    QUESTION_CACHE_TTL: int = 300
+    PRESIGNED_URL_EXPIRES_IN: int = 3600
+    PRESIGNED_URL_EXPIRY_MARGIN: int = 300
+    PRESIGNED_URL_CACHE_SIZE: int = 4096
+    PRESIGNED_URL_SHARED_CACHE: bool = False
+    PRINCIPAL_CACHE_TTL: int = 300
+    PRINCIPAL_CACHE_L1_TTL: int = 5
+    PRINCIPAL_CACHE_L1_SIZE: int = 10000
+
+    @model_validator(mode='after')
+    def validate_question_cache_ttl(self) -> Self:
+        # Cached question pages embed presigned avatar URLs, which are
+        # only guaranteed to stay valid for the expiry margin.
+        if self.QUESTION_CACHE_TTL > self.PRESIGNED_URL_EXPIRY_MARGIN:
+            raise ValueError(
+                'QUESTION_CACHE_TTL must not exceed '
+                'PRESIGNED_URL_EXPIRY_MARGIN'
+            )
+        return self
 
     class Config:
         env_file = './app/.env'
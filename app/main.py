@@ -1,10 +1,14 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.answers.routes import router as answers_router
 from app.auth.routes import router as auth_router
 from app.comments.routes import router as comments_router
+from app.core.adapters.postgres.postgres_adapter import async_session
 from app.dependencies import get_settings
+from app.permissions.repositories import PermissionRepository
 from app.permissions.routes import router as permissions_router
 from app.questions.routes import private_router as private_questions_router
 from app.questions.routes import public_router as public_questions_router
@@ -16,7 +20,24 @@ from app.users.routes import public_router as public_user_router
 
 settings = get_settings()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Route permission masks are compiled from PERMISSION_BIT_INDEXES,
+    # refuse to serve with a database that assigns other bits.
+    async with async_session() as session:
+        mismatches = await PermissionRepository(
+            session
+        ).get_bit_index_mismatches()
+    if mismatches:
+        raise RuntimeError(
+            'Permission bits differ from the registry: '
+            + ', '.join(sorted(mismatches))
+        )
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
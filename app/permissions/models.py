@@ -9,6 +9,9 @@ class PermissionModel(Base):
 
     id: Mapped[int_pk]
     name: Mapped[str] = mapped_column(unique=True)
+    # See PERMISSION_BIT_INDEXES, permissions which predate the registry
+    # and aren't registered have none.
+    bit_index: Mapped[int | None] = mapped_column(unique=True)
 
     roles: Mapped[list['RoleModel']] = relationship(
         'RoleModel',
@@ -3,6 +3,7 @@ from sqlalchemy import Select, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 
+from app.common.constants import PERMISSION_BIT_INDEXES
 from app.common.repositories.base_repository import BaseRepository
 from app.permissions.models import PermissionModel
 from app.roles.models import RoleModel
@@ -16,6 +17,21 @@ class PermissionRepository(BaseRepository):
             joinedload(self.model.roles)
         )
 
+    async def get_bit_index_mismatches(
+            self
+    ) -> list[str]:
+        """
+        Returns the names of the permissions whose stored bit differs
+        from PERMISSION_BIT_INDEXES.
+        """
+        permissions = await self.session.execute(
+            select(self.model.name, self.model.bit_index)
+        )
+        return [
+            name for name, bit_index in permissions
+            if bit_index != PERMISSION_BIT_INDEXES.get(name)
+        ]
+
     async def attach_permission_to_role(
             self,
             permission: PermissionModel,
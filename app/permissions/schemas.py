@@ -8,8 +8,13 @@ class PermissionBaseSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PermissionCreateSchema(PermissionBaseSchema):
+    bit_index: int
+
+
 class PermissionOutSchema(PermissionBaseSchema):
     id: int
+    bit_index: int | None
 
 class PermissionNameSchema(BaseModel):
     name: str
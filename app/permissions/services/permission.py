@@ -5,8 +5,12 @@ from fastapi import HTTPException
 from fastapi.params import Depends
 from sqlalchemy.exc import IntegrityError
 
+from app.common.constants import PRINCIPAL_CACHE_NAMESPACE, \
+    PERMISSION_BIT_INDEXES
+from app.common.repositories import CacheRepository
 from app.permissions.repositories import PermissionRepository
-from app.permissions.schemas import PermissionBaseSchema, PermissionOutSchema
+from app.permissions.schemas import PermissionBaseSchema, \
+    PermissionOutSchema, PermissionCreateSchema
 from app.roles.repositories import RoleRepository
 
 
@@ -14,18 +18,45 @@ class PermissionService:
     def __init__(
             self,
             permission_repository: Annotated[PermissionRepository, Depends()],
-            role_repository: Annotated[RoleRepository, Depends()]
+            role_repository: Annotated[RoleRepository, Depends()],
+            cache_repository: Annotated[CacheRepository, Depends()]
     ) -> None:
         self.permission_repository = permission_repository
         self.role_repository = role_repository
+        self.cache_repository = cache_repository
 
     async def create_permission(
             self,
             permission_schema: PermissionBaseSchema
     ) -> PermissionOutSchema:
+        """
+        Creates a permission registered in PERMISSION_BIT_INDEXES, the
+        source of truth of permissions, with its registered bit.
+        Creating an existing permission returns it unchanged, so the
+        endpoint can be used to create registry entries appended after
+        the seeding migration and is safe to repeat.
+        """
+        # Permissions are checked through masks compiled from the
+        # registry, an unregistered one could never be required.
+        bit_index = PERMISSION_BIT_INDEXES.get(permission_schema.name)
+        if bit_index is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Permission is not registered"
+            )
+
+        permission_model = await self.permission_repository.get_one(
+            {'name': permission_schema.name}
+        )
+        if permission_model:
+            return PermissionOutSchema.model_validate(permission_model)
+
         try:
             permission_model = await self.permission_repository.create(
-                permission_schema
+                PermissionCreateSchema(
+                    **permission_schema.model_dump(),
+                    bit_index=bit_index
+                )
             )
         except IntegrityError:
             raise HTTPException(
@@ -39,6 +70,9 @@ class PermissionService:
                 permission_model,
                 roles[0]
             )
+            await self.cache_repository.bump_generation(
+                PRINCIPAL_CACHE_NAMESPACE
+            )
         return PermissionOutSchema.model_validate(permission_model)
 
     async def attach_permission_to_role(
@@ -57,10 +91,14 @@ class PermissionService:
 
         role = await self.role_repository.get_entity_if_exists(role_id)
 
-        return await self.permission_repository.attach_permission_to_role(
-            permission,
-            role
+        is_attached = await (
+            self.permission_repository.attach_permission_to_role(
+                permission,
+                role
+            )
         )
+        await self.cache_repository.bump_generation(PRINCIPAL_CACHE_NAMESPACE)
+        return is_attached
 
     async def detach_permission_from_role(
             self,
@@ -85,7 +123,11 @@ class PermissionService:
                 detail="Permission is not attached to the role"
             )
 
-        return await self.permission_repository.detach_permission_from_role(
-            permission,
-            role
+        is_detached = await (
+            self.permission_repository.detach_permission_from_role(
+                permission,
+                role
+            )
         )
+        await self.cache_repository.bump_generation(PRINCIPAL_CACHE_NAMESPACE)
+        return is_detached
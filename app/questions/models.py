@@ -1,10 +1,14 @@
+import datetime
 from typing import Text
 
-from sqlalchemy import ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import ForeignKey, Computed, Index, DateTime, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Mapped, mapped_column, relationship, \
+    query_expression
 
+from app.common.constants import FULL_TEXT_SEARCH_CONFIG
 from app.common.models_mixins import CreatedAtUpdatedAtMixin, int_pk, \
-    CreatedAtMixin
+    CreatedAtMixin, VoteCountersMixin
 from app.core.adapters.postgres.postgres_adapter import Base
 
 
@@ -21,8 +25,34 @@ class QuestionTagModel(Base, CreatedAtMixin):
     )
 
 
-class QuestionModel(CreatedAtUpdatedAtMixin, Base):
+class QuestionModel(CreatedAtUpdatedAtMixin, VoteCountersMixin, Base):
     __tablename__ = 'questions'
+    __table_args__ = (
+        Index('ix_questions_score_id', 'score', 'id'),
+        Index('ix_questions_created_at_id', 'created_at', 'id'),
+        Index(
+            'ix_questions_last_activity_at_id',
+            'last_activity_at',
+            'id'
+        ),
+        Index(
+            'ix_questions_search_vector',
+            'search_vector',
+            postgresql_using='gin'
+        ),
+        Index(
+            'ix_questions_title_trgm',
+            'title',
+            postgresql_using='gin',
+            postgresql_ops={'title': 'gin_trgm_ops'}
+        ),
+        Index(
+            'ix_questions_body_trgm',
+            'body',
+            postgresql_using='gin',
+            postgresql_ops={'body': 'gin_trgm_ops'}
+        ),
+    )
 
     id: Mapped[int_pk]
     title: Mapped[str]
@@ -31,6 +61,29 @@ class QuestionModel(CreatedAtUpdatedAtMixin, Base):
     user_id: Mapped[int] = mapped_column(
         ForeignKey('users.id', ondelete='CASCADE')
     )
+    # Time of the last edit of the question, or of an answer or a comment
+    # posted or edited under it, maintained by
+    # QuestionRepository.update_last_activity. Votes are not activity.
+    last_activity_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+    # Generated by Postgres from the title (weight A) and the body (weight B),
+    # deferred so that it never travels with regular question selects.
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{FULL_TEXT_SEARCH_CONFIG}', "
+            f"coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{FULL_TEXT_SEARCH_CONFIG}', "
+            f"coalesce(body, '')), 'B')",
+            persisted=True
+        ),
+        deferred=True
+    )
+    # Aggregates, loaded on demand by QuestionRepository.
+    answer_count: Mapped[int] = query_expression()
+    comment_count: Mapped[int] = query_expression()
 
     user: Mapped['UserModel'] = relationship(
         'UserModel',
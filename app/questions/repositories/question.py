@@ -1,15 +1,21 @@
-from datetime import datetime
-
-from fastapi import HTTPException
-from sqlalchemy import Select, select, func, Subquery, case, and_, Sequence
+from sqlalchemy import Select, select, func, and_, Sequence, union, or_, \
+    ColumnElement, Float, cast, extract, Row, tuple_, distinct, desc, \
+    literal_column, update
 from sqlalchemy.dialects.postgresql import INTERVAL
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload, with_expression
 
 from app.answers.models import AnswerModel
+from app.comments.models import CommentModel
+from app.common.constants import FULL_TEXT_SEARCH_CONFIG, \
+    RELEVANCE_RECENCY_SCALE
 from app.common.repositories.base_repository import BaseRepository
-from app.questions.models import QuestionModel
+from app.common.types import LoadStrategyEnum
+from app.common.schemas import SearchScoreRangeSchema, \
+    SearchPhraseTermSchema, SearchTagTermSchema, SearchDateRangeSchema, \
+    SearchBooleanTermSchema
+from app.questions.models import QuestionModel, QuestionTagModel
+from app.questions.schemas import SearchSortEnum, QuestionSortEnum
 from app.tags.models import TagModel
-from app.votes.models import VotesModel
 
 
 class QuestionRepository(BaseRepository):
@@ -18,10 +24,53 @@ class QuestionRepository(BaseRepository):
     def _get_default_stmt(self) -> Select:
         return select(self.model).options(
             joinedload(self.model.user),
-            joinedload(self.model.answers),
             joinedload(self.model.tags),
-            joinedload(self.model.votes)
+            *self._get_count_options()
+        )
+
+    def _get_count_options(self) -> list:
+        """
+        Returns the loader options filling answer_count and comment_count
+        with correlated counts, backed by the question_id indexes of
+        answers and comments, so that no answer or comment row is loaded
+        just to be counted.
+        """
+        answer_count = (
+            select(func.count(AnswerModel.id))
+            .where(AnswerModel.question_id == self.model.id)
+            .correlate(self.model)
+            .scalar_subquery()
         )
+        comment_count = (
+            select(func.count(CommentModel.id))
+            .where(CommentModel.question_id == self.model.id)
+            .correlate(self.model)
+            .scalar_subquery()
+        )
+        return [
+            with_expression(self.model.answer_count, answer_count),
+            with_expression(self.model.comment_count, comment_count)
+        ]
+
+    async def update_last_activity(
+            self,
+            question_id: int
+    ) -> None:
+        """
+        Moves the last activity of a question to now, keeping updated_at,
+        which only tracks edits of the question itself.
+        """
+        await self.session.execute(
+            update(self.model)
+            .where(self.model.id == question_id)
+            .values(
+                {
+                    self.model.last_activity_at: func.now(),
+                    self.model.updated_at: self.model.updated_at
+                }
+            )
+        )
+        await self.session.commit()
 
     async def attach_tags_to_question(
             self,
@@ -55,87 +104,121 @@ class QuestionRepository(BaseRepository):
 
     async def get_by_id_with_joins(
             self,
-            question_id: int
-    ) -> QuestionModel:
-        stmt = self._get_default_stmt().options(
-            joinedload(self.model.answers).options(
-                joinedload(
-                    AnswerModel.comments
-                ),
-                joinedload(
-                    AnswerModel.votes
-                )
+            question_id: int,
+            load_strategy: LoadStrategyEnum = LoadStrategyEnum.selectin
+    ) -> QuestionModel | None:
+        """
+        Loads the question page tree. The author is always joined, being
+        a single row; the collections are loaded with load_strategy.
+        Joining them multiplies the rows of sibling collections, e.g.
+        answers x comments, while selectin and subquery loading fetch
+        every collection level with one more statement. Votes are not
+        loaded, the page only needs the current user's ones, see
+        VoteRepository.get_user_votes_for_question.
+        """
+        load = self._get_loader(load_strategy)
+        stmt = select(self.model).options(
+            joinedload(self.model.user),
+            load(self.model.tags),
+            load(self.model.answers).options(
+                load(AnswerModel.comments)
             ),
-            joinedload(self.model.comments)
-        )
+            load(self.model.comments),
+            *self._get_count_options()
+        ).filter_by(id=question_id)
 
-        return await self.session.scalar(stmt.filter_by(id=question_id))
+        questions = await self.session.scalars(stmt)
+        return questions.unique().first()
 
-    async def get_vote_difference_subquery(
+    async def get_searching_stmt(
             self
-    ) -> Subquery:
-        vote_difference_subquery = (
-            select(
-                self.model.id.label('question_id'),
-                func.sum(
-                    case(
-                        (VotesModel.is_upvote == True, 1),
-                        (VotesModel.is_upvote == False, -1),
-                        else_=0
-                    )
-                ).label('vote_difference')
-            )
-            .select_from(self.model)
-            .outerjoin(VotesModel, VotesModel.question_id == self.model.id)
-            .group_by(self.model.id)
-            .subquery()
-        )
-        return vote_difference_subquery
+    ) -> Select:
+        return select(self.model.id)
 
-    async def get_searching_stmt(
+    @staticmethod
+    async def __get_ts_query(
+            plain_text: str
+    ) -> ColumnElement:
+        return func.websearch_to_tsquery(FULL_TEXT_SEARCH_CONFIG, plain_text)
+
+    async def get_listing_stmt(
             self,
-            vote_difference_subquery: Subquery
+            sort: QuestionSortEnum
     ) -> Select:
-        stmt = (
-            select(self.model).options(
-                joinedload(self.model.user),
-                joinedload(self.model.tags),
-                joinedload(self.model.votes)
-            )
-            .outerjoin(AnswerModel, AnswerModel.question_id == self.model.id)
-            .outerjoin(
-                vote_difference_subquery,
-                vote_difference_subquery.c.question_id == self.model.id,
-            )
-        )
+        stmt = select(self.model.id)
+        if sort == QuestionSortEnum.unanswered:
+            stmt = stmt.where(~self.model.answers.any())
         return stmt
 
-    @staticmethod
+    async def get_listing_order_by(
+            self,
+            sort: QuestionSortEnum
+    ) -> list[ColumnElement]:
+        """
+        Returns the keyset sort key for the questions listing.
+        Every ordering is backed by a composite (column, id) index,
+        unanswered questions are listed newest first.
+        """
+        match sort:
+            case QuestionSortEnum.votes:
+                return [self.model.score, self.model.id]
+            case QuestionSortEnum.activity:
+                return [self.model.last_activity_at, self.model.id]
+            case _:
+                return [self.model.created_at, self.model.id]
+
+    async def get_search_order_by(
+            self,
+            sort: SearchSortEnum,
+            plain_text: str
+    ) -> list[ColumnElement]:
+        """
+        Returns the keyset sort key for the requested ordering.
+
+        Score, newest and activity are backed by the composite
+        (column, id) indexes, so a page is read from the top of the index.
+        Relevance is computed for the full-text matches only and falls
+        back to score ordering when the query has no plain text.
+        """
+        match sort:
+            case SearchSortEnum.newest:
+                return [self.model.created_at, self.model.id]
+            case SearchSortEnum.activity:
+                return [self.model.last_activity_at, self.model.id]
+            case SearchSortEnum.relevance if plain_text:
+                ts_query = await self.__get_ts_query(plain_text)
+                rank = func.ts_rank_cd(
+                    self.model.search_vector,
+                    ts_query,
+                    32,
+                    type_=Float
+                )
+                popularity = 1 + func.ln(
+                    1 + func.greatest(self.model.score, 0),
+                    type_=Float
+                )
+                recency = cast(
+                    extract('epoch', self.model.created_at),
+                    Float
+                ) / RELEVANCE_RECENCY_SCALE
+                return [rank * popularity + recency, self.model.id]
+            case _:
+                return [self.model.score, self.model.id]
+
     async def apply_scores_conditions(
+            self,
             stmt: Select,
-            score_params: list,
-            vote_difference_subquery: Subquery
+            score_ranges: list[SearchScoreRangeSchema]
     ) -> Select:
         score_conditions = []
-        for param in score_params:
-            if param['operator'] in ['..', '-']:
-                if param['min_score']:
-                    score_conditions.append(
-                        vote_difference_subquery.c.vote_difference >= int(
-                            param['min_score']
-                        )
-                    )
-                if param['max_score']:
-                    score_conditions.append(
-                        vote_difference_subquery.c.vote_difference <= int(
-                            param['max_score']
-                        )
-                    )
-            else:
+        for score_range in score_ranges:
+            if score_range.min_score is not None:
                 score_conditions.append(
-                    vote_difference_subquery.c.vote_difference >= int(
-                        param['min_score']
-                    )
+                    self.model.score >= score_range.min_score
+                )
+            if score_range.max_score is not None:
+                score_conditions.append(
+                    self.model.score <= score_range.max_score
                 )
 
         return stmt.where(and_(*score_conditions))
@@ -143,35 +226,63 @@ class QuestionRepository(BaseRepository):
     async def apply_strict_conditions(
             self,
             stmt: Select,
-            strict_params: list
+            phrases: list[SearchPhraseTermSchema]
     ) -> Select:
         strict_conditions = []
-        for field, term in strict_params:
-            if field == "body":
-                strict_conditions.append(self.model.body.ilike(f"%{term}%"))
-            elif field == "title":
-                strict_conditions.append(self.model.title.ilike(f"%{term}%"))
-            elif field == "":
+        for phrase in phrases:
+            pattern = f"%{phrase.text}%"
+            if phrase.field == "body":
+                strict_conditions.append(self.model.body.ilike(pattern))
+            elif phrase.field == "title":
+                strict_conditions.append(self.model.title.ilike(pattern))
+            else:
+                # One predicate per column keeps every branch servable by
+                # its own trigram index, which a concatenation is not.
                 strict_conditions.append(
-                    func.concat(
-                        self.model.title,
-                        self.model.body,
-                        AnswerModel.body
-                    ).ilike(f"%{term}%")
+                    or_(
+                        self.model.title.ilike(pattern),
+                        self.model.body.ilike(pattern),
+                        self.model.id.in_(
+                            select(AnswerModel.question_id).where(
+                                AnswerModel.body.ilike(pattern)
+                            )
+                        )
+                    )
                 )
         return stmt.where(and_(*strict_conditions))
 
+    async def apply_plain_text_conditions(
+            self,
+            stmt: Select,
+            plain_text: str
+    ) -> Select:
+        if not plain_text:
+            return stmt
+
+        ts_query = await self.__get_ts_query(plain_text)
+        # Both branches are served by the GIN indexes on the generated
+        # search vectors, so no question or answer row is scanned.
+        matching_question_ids = union(
+            select(self.model.id).where(
+                self.model.search_vector.bool_op('@@')(ts_query)
+            ),
+            select(AnswerModel.question_id).where(
+                AnswerModel.search_vector.bool_op('@@')(ts_query)
+            )
+        )
+        return stmt.where(self.model.id.in_(matching_question_ids))
+
     async def apply_tags_conditions(
             self,
             stmt: Select,
-            tags_params: list
+            tags: list[SearchTagTermSchema]
     ) -> Select:
         tags_conditions = []
-        for is_negative, tag in tags_params:
+        for tag in tags:
             condition = self.model.tags.any(
-                TagModel.name.ilike(f"%{tag}%")
+                TagModel.name.ilike(f"%{tag.name}%")
             )
-            if is_negative:
+            if tag.is_negative:
                 condition = ~condition
             tags_conditions.append(condition)
 
@@ -180,86 +291,184 @@ class QuestionRepository(BaseRepository):
     async def apply_users_conditions(
             self,
             stmt: Select,
-            users_params: list
+            user_ids: list[int]
     ) -> Select:
         users_conditions = [
-            self.model.user_id == int(user_id)
-            for user_id in users_params
+            self.model.user_id == user_id
+            for user_id in user_ids
         ]
         return stmt.where(and_(*users_conditions))
 
-    @staticmethod
-    async def __parse_date(
-            date_str: str
-    ) -> datetime:
-        formats = ['%Y-%m-%d', '%Y-%m', '%Y']
-
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
-
-        raise HTTPException(
-            status_code=400,
-            detail='Invalid date format'
-        )
-
     async def apply_dates_conditions(
             self,
             stmt: Select,
-            date_params: tuple
+            date_ranges: list[SearchDateRangeSchema]
     ) -> Select:
         date_conditions = []
 
-        for date in date_params:
+        for date_range in date_ranges:
             field = (
-                self.model.created_at if date['field'] == 'created'
-                else self.model.updated_at
+                self.model.created_at if date_range.field == 'created'
+                else self.model.last_activity_at
             )
 
-            if date['operator']:
+            if date_range.end_date:
                 date_conditions.append(
-                    field.between(
-                        await self.__parse_date(date['start_date']),
-                        await self.__parse_date(date['end_date'])
-                    )
+                    field.between(date_range.start_date, date_range.end_date)
                 )
             else:
-                date_conditions.append(
-                    field >= await self.__parse_date(date['start_date'])
-                )
+                date_conditions.append(field >= date_range.start_date)
 
         return stmt.where(and_(*date_conditions))
 
     async def apply_booleans_conditions(
             self,
             stmt: Select,
-            boolean_params: list
+            booleans: list[SearchBooleanTermSchema]
     ) -> Select:
         boolean_conditions = []
-        for field, value in boolean_params:
-            if field == 'hasaccepted':
+        for boolean in booleans:
+            if boolean.field == 'hasaccepted':
                 boolean_conditions.append(
                     self.model.accepted_answer_id.isnot(None)
-                    if value in ['true', 'yes', '1']
+                    if boolean.value
                     else self.model.accepted_answer_id.is_(None)
                 )
-            elif field == 'isanswered':
+            elif boolean.field == 'isanswered':
                 boolean_conditions.append(
                     self.model.answers.any()
-                    if value in ['true', 'yes', '1']
+                    if boolean.value
                     else ~self.model.answers.any()
                 )
 
         return stmt.where(and_(*boolean_conditions))
 
-    async def fetch_questions_search(
+    async def fetch_question_ids_page(
             self,
-            stmt: Select
-    ) -> Sequence[QuestionModel]:
+            stmt: Select,
+            order_by: list[ColumnElement],
+            limit: int
+    ) -> tuple[list[int], list | None]:
+        """
+        Returns the ordered ids of one page of matching questions along
+        with the sort key values of its last question when a next page
+        exists.
+        """
+        rows = await self.session.execute(stmt.add_columns(*order_by))
+        rows = rows.all()
+
+        next_cursor_values = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor_values = list(rows[-1][1:])
+
+        return [row[0] for row in rows], next_cursor_values
+
+    async def fetch_search_facets(
+            self,
+            stmt: Select,
+            tags_limit: int
+    ) -> Sequence[Row]:
+        """
+        Counts the questions matched by the search statement in a single
+        grouped pass. The empty grouping set yields the totals row, which
+        is returned first, followed by the most frequent tags.
+        """
+        filtered = stmt.add_columns(
+            self.model.accepted_answer_id.isnot(None).label(
+                'has_accepted_answer'
+            ),
+            self.model.answers.any().label('is_answered')
+        ).subquery()
+
+        # Every question appears once per tag after the join, so the
+        # totals row has to count distinct questions.
+        question_count = func.count(distinct(filtered.c.id))
+        is_totals_row = func.grouping(QuestionTagModel.tag_id)
+
+        facets_stmt = select(
+            is_totals_row.label('is_totals_row'),
+            QuestionTagModel.tag_id,
+            TagModel.name,
+            question_count.label('total_count'),
+            question_count.filter(filtered.c.is_answered).label(
+                'answered_count'
+            ),
+            question_count.filter(~filtered.c.is_answered).label(
+                'unanswered_count'
+            ),
+            question_count.filter(filtered.c.has_accepted_answer).label(
+                'has_accepted_answer_count'
+            )
+        ).select_from(filtered).outerjoin(
+            QuestionTagModel,
+            QuestionTagModel.question_id == filtered.c.id
+        ).outerjoin(
+            TagModel,
+            TagModel.id == QuestionTagModel.tag_id
+        ).group_by(
+            func.grouping_sets(
+                tuple_(),
+                tuple_(QuestionTagModel.tag_id, TagModel.name)
+            )
+        ).having(
+            # Drops the group of untagged questions
+            or_(is_totals_row == 1, QuestionTagModel.tag_id.isnot(None))
+        ).order_by(
+            desc(literal_column('is_totals_row')),
+            desc(literal_column('total_count')),
+            TagModel.name
+        ).limit(tags_limit + 1)
+
+        facets = await self.session.execute(facets_stmt)
+        return facets.all()
+
+    async def get_ids_by_user(
+            self,
+            user_id: int
+    ) -> list[int]:
+        question_ids = await self.session.scalars(
+            select(self.model.id).where(self.model.user_id == user_id)
+        )
+        return list(question_ids.all())
+
+    async def get_ids_by_tag(
+            self,
+            tag_id: int
+    ) -> list[int]:
+        question_ids = await self.session.scalars(
+            select(QuestionTagModel.question_id).where(
+                QuestionTagModel.tag_id == tag_id
+            )
+        )
+        return list(question_ids.all())
+
+    async def get_by_ids_for_list(
+            self,
+            question_ids: list[int]
+    ) -> list[QuestionModel]:
+        """
+        Hydrates the given questions for a listing, keeping the order
+        of the ids. Tags are fetched with one batched IN query instead
+        of being joined to the question rows, answers and comments are
+        only counted.
+        """
+        if not question_ids:
+            return []
+
+        stmt = select(self.model).options(
+            joinedload(self.model.user),
+            selectinload(self.model.tags),
+            *self._get_count_options()
+        ).where(self.model.id.in_(question_ids))
         questions = await self.session.scalars(stmt)
-        return questions.unique().all()
+        questions_by_id = {question.id: question for question in questions}
+
+        return [
+            questions_by_id[question_id]
+            for question_id in question_ids
+            if question_id in questions_by_id
+        ]
 
     async def get_questions_without_answer(
             self
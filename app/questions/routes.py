@@ -1,8 +1,11 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Header, Response
 
 from app.auth.services import AuthService
+from app.common.constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.common.types import LoadStrategyEnum
+from app.common.utils import etag_matches
 from app.questions import schemas as question_schemas
 from app.questions.services import QuestionService
 from app.votes import schemas as vote_schemas
@@ -29,29 +32,53 @@ search_router = APIRouter(
 
 @search_router.get(
     '',
-    response_model=list[question_schemas.QuestionForListOutSchema]
+    response_model=question_schemas.QuestionForListPageOutSchema
 )
 async def search(
+        question_service: Annotated[QuestionService, Depends()],
+        query: str,
+        sort: question_schemas.SearchSortEnum = (
+            question_schemas.SearchSortEnum.relevance
+        ),
+        limit: Annotated[
+            int, Query(ge=1, le=MAX_PAGE_SIZE)
+        ] = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None
+):
+    return await question_service.search(query, sort, limit, cursor)
+
+
+@search_router.get(
+    '/facets',
+    response_model=question_schemas.SearchFacetsOutSchema
+)
+async def search_facets(
         question_service: Annotated[QuestionService, Depends()],
         query: str
 ):
-    return await question_service.search(query)
+    return await question_service.search_facets(query)
 
 
 # Public routes
 
 @public_router.get(
     '/',
-    response_model=list[question_schemas.QuestionForListOutSchema]
+    response_model=question_schemas.QuestionForListPageOutSchema
 )
 async def get_questions(
         question_service: Annotated[QuestionService, Depends()],
-        skip: int = 0,
-        limit: int = 100
+        sort: question_schemas.QuestionSortEnum = (
+            question_schemas.QuestionSortEnum.newest
+        ),
+        limit: Annotated[
+            int, Query(ge=1, le=MAX_PAGE_SIZE)
+        ] = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None
 ):
     return await question_service.get_questions(
-        skip,
-        limit
+        sort,
+        limit,
+        cursor
     )
 
 
@@ -61,9 +88,21 @@ async def get_questions(
 )
 async def get_question(
         question_service: Annotated[QuestionService, Depends()],
-        question_id: int
+        question_id: int,
+        if_none_match: Annotated[str | None, Header()] = None
 ):
-    return await question_service.get_question(question_id)
+    body, etag = await question_service.get_question_response(
+        question_id,
+        LoadStrategyEnum.selectin
+    )
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={'ETag': etag})
+
+    return Response(
+        content=body,
+        media_type='application/json',
+        headers={'ETag': etag}
+    )
 
 
 # Private routes
@@ -176,7 +215,8 @@ async def get_question_with_user_vote(
 ):
     return await question_service.get_question(
         question_id,
-        user_id
+        user_id,
+        LoadStrategyEnum.selectin
     )
 
 
@@ -1,3 +1,4 @@
+from enum import Enum
 from functools import cached_property
 from typing import Text
 
@@ -5,11 +6,26 @@ from pydantic import BaseModel, ConfigDict, Field, computed_field
 
 from app.answers.schemas import AnswerWithCommentsOutSchema
 from app.comments.schemas import CommentOutSchema
+from app.common.schemas import CursorPageOutSchema
 from app.common.schemas_mixins import CreatedAtUpdatedAtMixin
 from app.users.schemas import UserOutSchema
 from app.votes.schemas import VoteOutSchema
 
 
+class SearchSortEnum(str, Enum):
+    relevance = 'relevance'
+    score = 'score'
+    newest = 'newest'
+    activity = 'activity'
+
+
+class QuestionSortEnum(str, Enum):
+    newest = 'newest'
+    votes = 'votes'
+    activity = 'activity'
+    unanswered = 'unanswered'
+
+
 class QuestionBaseSchema(BaseModel):
     title: str = Field(min_length=10, max_length=150)
     body: Text = Field(min_length=30, max_length=3500)
@@ -39,17 +55,17 @@ class QuestionOutSchema(QuestionBaseSchema, CreatedAtUpdatedAtMixin):
     id: int
     user_id: int
     accepted_answer_id: int | None
+    score: int = 0
+    upvote_count: int = 0
+    downvote_count: int = 0
     votes: list[VoteOutSchema] | None = Field(None, exclude=True)
 
     # Returns the difference of votes for the question.
+    # Kept for compatibility, it mirrors the denormalized score.
     @computed_field
     @cached_property
     def votes_difference(self) -> int:
-        if self.votes:
-            upvotes = sum(vote.is_upvote for vote in self.votes)
-            downvotes = len(self.votes) - upvotes
-            return upvotes - downvotes
-        return 0
+        return self.score
 
 
 class TagOutSchema(BaseModel):
@@ -65,26 +81,32 @@ class QuestionWithTagsOutSchema(QuestionOutSchema):
 
 class QuestionForListOutSchema(QuestionOutSchema):
     user: UserOutSchema
-    answers: list[AnswerWithCommentsOutSchema] = Field(None, exclude=True)
     tags: list[TagOutSchema]
+    answer_count: int = 0
+    comment_count: int = 0
+
+
+class QuestionForListPageOutSchema(
+    CursorPageOutSchema[QuestionForListOutSchema]
+):
+    pass
 
-    # Returns the number of answers for the question.
-    @computed_field
-    @cached_property
-    def answer_count(self) -> int:
-        return len(self.answers)
+
+class SearchTagFacetOutSchema(BaseModel):
+    id: int
+    name: str
+    question_count: int
+
+
+class SearchFacetsOutSchema(BaseModel):
+    total_count: int = 0
+    answered_count: int = 0
+    unanswered_count: int = 0
+    has_accepted_answer_count: int = 0
+    tags: list[SearchTagFacetOutSchema] = []
 
 
 class QuestionWithJoinsOutSchema(QuestionForListOutSchema):
     answers: list[AnswerWithCommentsOutSchema]
     comments: list[CommentOutSchema]
-    current_user_id: int | None = Field(None, exclude=True)
-
-    # Checks if the current user has voted on the question.
-    # If the user has voted, it returns the VoteOutSchema.
-    # If the user has not voted, it returns None.
-    @computed_field
-    @cached_property
-    def current_user_vote(self) -> VoteOutSchema | None:
-        vote_dict = {vote.user_id: vote for vote in self.votes}
-        return vote_dict.get(self.current_user_id, None)
+    current_user_vote: VoteOutSchema | None = None
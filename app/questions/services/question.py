@@ -1,20 +1,34 @@
+import hashlib
 from typing import Annotated
 
 from fastapi import Depends, HTTPException
+from sqlalchemy import Select
 
 from app.answers.repositories import AnswerRepository
-from app.common.repositories import StorageItemRepository
+from app.auth.schemas import SecurityContextSchema
+from app.auth.services import AuthService
+from app.common.constants import SEARCH_CACHE_NAMESPACE, \
+    SEARCH_SCORE_CACHE_NAMESPACE, SEARCH_FACET_TAGS_LIMIT, \
+    AVATAR_LIST_VARIANT_SIZE
+from app.common.repositories import CacheRepository
+from app.common.schemas import SearchQuerySchema
 from app.common.services import SearchService
-from app.common.services import StorageItemService
+from app.common.types import LoadStrategyEnum
+from app.common.utils import encode_cursor, decode_cursor, \
+    get_question_cache_namespace
 from app.dependencies import get_settings
+from app.questions.models import QuestionModel
 from app.questions.repositories import QuestionRepository
 from app.questions.schemas import QuestionCreateSchema, \
     QuestionWithJoinsOutSchema, QuestionForListOutSchema, \
     QuestionWithTagsOutSchema, QuestionCreatePayloadSchema, \
-    QuestionUpdatePayloadSchema, QuestionUpdateSchema
+    QuestionUpdatePayloadSchema, QuestionUpdateSchema, \
+    QuestionForListPageOutSchema, SearchSortEnum, SearchFacetsOutSchema, \
+    SearchTagFacetOutSchema, QuestionSortEnum
 from app.tags.repositories import TagRepository
 from app.users.repositories import UserRepository
 from app.users.services import UserService
+from app.votes.repository import VoteRepository
 
 
 class QuestionService:
@@ -26,8 +40,12 @@ class QuestionService:
             tag_repository: Annotated[TagRepository, Depends()],
             search_service: Annotated[SearchService, Depends()],
             user_service: Annotated[UserService, Depends()],
-            storage_item_service: Annotated[StorageItemService, Depends()],
-            storage_item_repository: Annotated[StorageItemRepository, Depends()]
+            cache_repository: Annotated[CacheRepository, Depends()],
+            vote_repository: Annotated[VoteRepository, Depends()],
+            security_context: Annotated[
+                SecurityContextSchema,
+                Depends(AuthService.get_security_context)
+            ]
     ) -> None:
         self.question_repository = question_repository
         self.user_repository = user_repository
@@ -35,8 +53,9 @@ class QuestionService:
         self.tag_repository = tag_repository
         self.search_service = search_service
         self.user_service = user_service
-        self.storage_item_service = storage_item_service
-        self.storage_item_repository = storage_item_repository
+        self.cache_repository = cache_repository
+        self.vote_repository = vote_repository
+        self.security_context = security_context
 
     async def create_question(
             self,
@@ -57,6 +76,7 @@ class QuestionService:
             question_model,
             tags
         )
+        await self.cache_repository.bump_generation(SEARCH_CACHE_NAMESPACE)
 
         return QuestionWithTagsOutSchema.model_validate(question_model)
 
@@ -64,38 +84,47 @@ class QuestionService:
             self,
             question_id: int,
             user_id: int | None = None,
+            load_strategy: LoadStrategyEnum = LoadStrategyEnum.selectin
     ) -> QuestionWithJoinsOutSchema:
         question = await self.question_repository.get_by_id_with_joins(
-            question_id
+            question_id,
+            load_strategy
         )
         if not question:
             raise HTTPException(status_code=404, detail='Question not found')
 
-        # Checks if the current user has voted on the answers.
-        answers_with_user_vote = question.answers
+        # Fetches only the current user's votes on the question
+        # and on its answers.
+        question_vote = None
+        answer_votes = {}
         if user_id:
-            answers_with_user_vote = [
-                {
-                    **answer.__dict__,
-                    'current_user_id': user_id
-                } for answer in question.answers
-            ]
+            votes = await self.vote_repository.get_user_votes_for_question(
+                user_id,
+                question_id
+            )
+            for vote in votes:
+                if vote.answer_id:
+                    answer_votes[vote.answer_id] = vote
+                else:
+                    question_vote = vote
 
-        settings = get_settings()
+        answers_with_user_vote = [
+            {
+                **answer.__dict__,
+                'current_user_vote': answer_votes.get(answer.id)
+            } for answer in question.answers
+        ]
 
         user_model = question.user
 
-        item_model = await self.storage_item_repository.get_by_id(
-            user_model.avatar_file_storage_id
+        avatar_urls = await self.user_service.get_avatar_urls(
+            [user_model.avatar_file_storage_id],
+            AVATAR_LIST_VARIANT_SIZE
         )
-        avatar_url = await self.storage_item_service.generate_presigned_url(
-            settings.AWS_BUCKET_NAME,
-            item_model.storage_path
-        ) if item_model else None
 
         user_schema = {
             **user_model.__dict__,
-            'avatar_url': avatar_url
+            'avatar_url': avatar_urls.get(user_model.avatar_file_storage_id)
         }
 
         return QuestionWithJoinsOutSchema.model_validate(
@@ -103,48 +132,104 @@ class QuestionService:
                 **question.__dict__,
                 'user': user_schema,
                 'answers': answers_with_user_vote,
-                'current_user_id': user_id
+                'current_user_vote': question_vote
             }
         )
 
-    async def get_questions(
+    async def __get_list_out_schemas(
             self,
-            skip: int = 0,
-            limit: int = 100
+            questions: list[QuestionModel]
     ) -> list[QuestionForListOutSchema]:
-        questions = await self.question_repository.get_multi_with_joins(
-            {},
-            skip,
-            limit
+        avatar_urls = await self.user_service.get_avatar_urls(
+            [question.user.avatar_file_storage_id for question in questions],
+            AVATAR_LIST_VARIANT_SIZE
         )
 
-        settings = get_settings()
-
-        questions_with_user_avatar_url = []
-
-        for question in questions:
-            item_model = await self.storage_item_repository.get_by_id(
-                question.user.avatar_file_storage_id
-            )
-            avatar_url = await self.storage_item_service.generate_presigned_url(
-                settings.AWS_BUCKET_NAME,
-                item_model.storage_path
-            ) if item_model else None
-
-            question_with_user_avatar_url = QuestionForListOutSchema.model_validate(
+        return [
+            QuestionForListOutSchema.model_validate(
                 {
                     **question.__dict__,
                     'user': {
                         **question.user.__dict__,
-                        'avatar_url': avatar_url
+                        'avatar_url': avatar_urls.get(
+                            question.user.avatar_file_storage_id
+                        )
                     }
                 }
             )
-            questions_with_user_avatar_url.append(
-                question_with_user_avatar_url
+            for question in questions
+        ]
+
+    async def get_question_response(
+            self,
+            question_id: int,
+            load_strategy: LoadStrategyEnum = LoadStrategyEnum.selectin
+    ) -> tuple[str, str]:
+        """
+        Returns the serialized public question page and its strong ETag.
+        Responses are cached under the current version of the question,
+        which is bumped by every change to the question, its answers,
+        comments and votes, the deletion of its tags and the profile
+        updates of its author, so a cached response is never stale.
+        """
+        version = await self.cache_repository.get_generation(
+            get_question_cache_namespace(question_id)
+        )
+        cache_key = f'{get_question_cache_namespace(question_id)}:{version}'
+        cached_response = await self.cache_repository.get_json(cache_key)
+        if cached_response is not None:
+            return cached_response['body'], cached_response['etag']
+
+        question = await self.get_question(
+            question_id,
+            load_strategy=load_strategy
+        )
+        body = question.model_dump_json()
+        etag = f'"{hashlib.sha256(body.encode()).hexdigest()}"'
+
+        # The page embeds presigned avatar URLs, which stay valid for at
+        # least PRESIGNED_URL_EXPIRY_MARGIN, the upper bound of the TTL.
+        settings = get_settings()
+        await self.cache_repository.set_json(
+            cache_key,
+            {'body': body, 'etag': etag},
+            settings.QUESTION_CACHE_TTL
+        )
+
+        return body, etag
+
+    async def get_questions(
+            self,
+            sort: QuestionSortEnum,
+            limit: int,
+            cursor: str | None = None
+    ) -> QuestionForListPageOutSchema:
+        stmt = await self.question_repository.get_listing_stmt(sort)
+        order_by = await self.question_repository.get_listing_order_by(sort)
+        stmt = await self.question_repository.paginate_by_keyset(
+            stmt,
+            order_by,
+            decode_cursor(cursor) if cursor else None,
+            limit
+        )
+
+        question_ids, next_cursor_values = await (
+            self.question_repository.fetch_question_ids_page(
+                stmt,
+                order_by,
+                limit
             )
+        )
+        questions = await self.question_repository.get_by_ids_for_list(
+            question_ids
+        )
 
-        return questions_with_user_avatar_url
+        return QuestionForListPageOutSchema(
+            items=await self.__get_list_out_schemas(questions),
+            next_cursor=encode_cursor(
+                next_cursor_values
+            ) if next_cursor_values else None
+        )
 
     async def update_question(
             self,
@@ -165,15 +250,12 @@ class QuestionService:
                     detail='Answer does not belong to this question'
                 )
 
-        user_permissions = await self.user_service.get_user_permissions(
-            user_id
+        AuthService.ensure_owner_or_permission(
+            self.security_context,
+            question.user_id,
+            'update_any_question',
+            'You are not allowed to update this question'
         )
-
-        if question.user_id != user_id and 'update_any_question' not in user_permissions:
-            raise HTTPException(
-                status_code=403,
-                detail='You are not allowed to update this question'
-            )
         update_schema = QuestionUpdateSchema(
             **question_payload_schema.model_dump(exclude_unset=True)
         )
@@ -182,6 +264,7 @@ class QuestionService:
             question_id,
             update_schema
         )
+        await self.question_repository.update_last_activity(question_id)
 
         await self.question_repository.expire_session_for_all()
         question = await self.question_repository.get_by_id_with_joins(
@@ -197,6 +280,10 @@ class QuestionService:
                 question,
                 tags
             )
+        await self.cache_repository.bump_generation(SEARCH_CACHE_NAMESPACE)
+        await self.cache_repository.bump_generation(
+            get_question_cache_namespace(question_id)
+        )
 
         return QuestionWithJoinsOutSchema.model_validate(
             question
@@ -210,82 +297,221 @@ class QuestionService:
         question = await self.question_repository.get_entity_if_exists(
             question_id
         )
-        user_permissions = await self.user_service.get_user_permissions(
-            user_id
+        AuthService.ensure_owner_or_permission(
+            self.security_context,
+            question.user_id,
+            'delete_any_question',
+            'You are not allowed to delete this question'
+        )
+        is_deleted = await self.question_repository.delete(question_id)
+        await self.cache_repository.bump_generation(SEARCH_CACHE_NAMESPACE)
+        await self.cache_repository.bump_generation(
+            get_question_cache_namespace(question_id)
+        )
+        return is_deleted
+
+    async def __build_search_stmt(
+            self,
+            parsed_query: SearchQuerySchema
+    ) -> Select:
+        stmt = await self.question_repository.get_searching_stmt()
+
+        if parsed_query.scores:
+            stmt = await self.question_repository.apply_scores_conditions(
+                stmt,
+                parsed_query.scores
+            )
+        if parsed_query.phrases:
+            stmt = await self.question_repository.apply_strict_conditions(
+                stmt,
+                parsed_query.phrases
+            )
+        if parsed_query.plain_text:
+            stmt = await (
+                self.question_repository.apply_plain_text_conditions(
+                    stmt,
+                    parsed_query.plain_text
+                )
+            )
+        if parsed_query.tags:
+            stmt = await self.question_repository.apply_tags_conditions(
+                stmt,
+                parsed_query.tags
+            )
+        if parsed_query.users:
+            stmt = await self.question_repository.apply_users_conditions(
+                stmt,
+                parsed_query.users
+            )
+        if parsed_query.dates:
+            stmt = await self.question_repository.apply_dates_conditions(
+                stmt,
+                parsed_query.dates
+            )
+        if parsed_query.booleans:
+            stmt = await self.question_repository.apply_booleans_conditions(
+                stmt,
+                parsed_query.booleans
+            )
+
+        return stmt
+
+    async def __get_search_cache_key(
+            self,
+            parsed_query: SearchQuerySchema,
+            sort: SearchSortEnum | None,
+            *parts: str | int
+    ) -> str:
+        """
+        Builds the cache key of a search from the content generation and,
+        only for the results that depend on question scores, the score
+        generation, so votes leave the other cached searches intact.
+        """
+        namespaces = [SEARCH_CACHE_NAMESPACE]
+        if parsed_query.scores or sort in (
+                SearchSortEnum.score,
+                SearchSortEnum.relevance
+        ):
+            namespaces.append(SEARCH_SCORE_CACHE_NAMESPACE)
+        generations = await self.cache_repository.get_generations(namespaces)
+        generation = '.'.join(str(generation) for generation in generations)
+        query_key = await self.search_service.get_query_cache_key(
+            parsed_query
+        )
+        prefix = ':'.join(str(part) for part in parts)
+
+        return f'{SEARCH_CACHE_NAMESPACE}:{generation}:{prefix}:{query_key}'
+
+    async def __find_question_ids(
+            self,
+            parsed_query: SearchQuerySchema,
+            sort: SearchSortEnum,
+            limit: int,
+            cursor: str | None
+    ) -> tuple[list[int], str | None]:
+        stmt = await self.__build_search_stmt(parsed_query)
+
+        order_by = await self.question_repository.get_search_order_by(
+            sort,
+            parsed_query.plain_text
+        )
+        stmt = await self.question_repository.paginate_by_keyset(
+            stmt,
+            order_by,
+            decode_cursor(cursor) if cursor else None,
+            limit
         )
 
-        if question.user_id != user_id and 'delete_any_question' not in user_permissions:
-            raise HTTPException(
-                status_code=403,
-                detail='You are not allowed to delete this question'
+        question_ids, next_cursor_values = await (
+            self.question_repository.fetch_question_ids_page(
+                stmt,
+                order_by,
+                limit
             )
-        return await self.question_repository.delete(question_id)
+        )
+        next_cursor = encode_cursor(
+            next_cursor_values
+        ) if next_cursor_values else None
+
+        return question_ids, next_cursor
 
     async def search(
             self,
-            query: str
-    ) -> list[QuestionForListOutSchema]:
+            query: str,
+            sort: SearchSortEnum,
+            limit: int,
+            cursor: str | None = None
+    ) -> QuestionForListPageOutSchema:
         parsed_query = await self.search_service.parse_query(query)
 
-        vote_difference_subquery = (
-            await self.question_repository.get_vote_difference_subquery()
+        # Only first pages are cached, deeper pages are cheap keyset reads
+        # and far less repeated.
+        cache_key = None
+        cached_page = None
+        if cursor is None:
+            cache_key = await self.__get_search_cache_key(
+                parsed_query,
+                sort,
+                sort.value,
+                limit
+            )
+            cached_page = await self.cache_repository.get_json(cache_key)
+
+        if cached_page is not None:
+            question_ids = cached_page['ids']
+            next_cursor = cached_page['next_cursor']
+        else:
+            question_ids, next_cursor = await self.__find_question_ids(
+                parsed_query,
+                sort,
+                limit,
+                cursor
+            )
+            if cache_key is not None:
+                settings = get_settings()
+                await self.cache_repository.set_json(
+                    cache_key,
+                    {'ids': question_ids, 'next_cursor': next_cursor},
+                    settings.SEARCH_CACHE_TTL
+                )
+
+        questions = await self.question_repository.get_by_ids_for_list(
+            question_ids
         )
 
-        stmt = await self.question_repository.get_searching_stmt(
-            vote_difference_subquery
+        return QuestionForListPageOutSchema(
+            items=await self.__get_list_out_schemas(questions),
+            next_cursor=next_cursor
         )
 
-        for key, value in parsed_query.items():
-            match key:
-                case 'scores':
-                    stmt = await (
-                        self.question_repository.apply_scores_conditions(
-                            stmt,
-                            value,
-                            vote_difference_subquery
-                        )
-                    )
-                case 'strict_text':
-                    stmt = await (
-                        self.question_repository.apply_strict_conditions(
-                            stmt,
-                            value
-                        )
-                    )
-                case 'tags':
-                    stmt = await (
-                        self.question_repository.apply_tags_conditions(
-                            stmt,
-                            value
-                        )
-                    )
-                case 'users':
-                    stmt = await (
-                        self.question_repository.apply_users_conditions(
-                            stmt,
-                            value
-                        )
-                    )
-                case 'dates':
-                    stmt = await (
-                        self.question_repository.apply_dates_conditions(
-                            stmt,
-                            value
-                        )
-                    )
-                case 'booleans':
-                    stmt = await (
-                        self.question_repository.apply_booleans_conditions(
-                            stmt,
-                            value
-                        )
+    async def search_facets(
+            self,
+            query: str
+    ) -> SearchFacetsOutSchema:
+        parsed_query = await self.search_service.parse_query(query)
+
+        # Facets share the generations of the result pages, so both are
+        # invalidated together by any write that can change a search.
+        # Facet counts do not depend on scores unless the query filters
+        # by score.
+        cache_key = await self.__get_search_cache_key(
+            parsed_query,
+            None,
+            'facets'
+        )
+        cached_facets = await self.cache_repository.get_json(cache_key)
+        if cached_facets is not None:
+            return SearchFacetsOutSchema.model_validate(cached_facets)
+
+        stmt = await self.__build_search_stmt(parsed_query)
+        rows = await self.question_repository.fetch_search_facets(
+            stmt,
+            SEARCH_FACET_TAGS_LIMIT
+        )
+
+        facets = SearchFacetsOutSchema()
+        for row in rows:
+            if row.is_totals_row:
+                facets.total_count = row.total_count
+                facets.answered_count = row.answered_count
+                facets.unanswered_count = row.unanswered_count
+                facets.has_accepted_answer_count = (
+                    row.has_accepted_answer_count
+                )
+            else:
+                facets.tags.append(
+                    SearchTagFacetOutSchema(
+                        id=row.tag_id,
+                        name=row.name,
+                        question_count=row.total_count
                     )
+                )
 
-        questions = await self.question_repository.fetch_questions_search(stmt)
+        settings = get_settings()
+        await self.cache_repository.set_json(
+            cache_key,
+            facets.model_dump(),
+            settings.SEARCH_CACHE_TTL
+        )
 
-        return [
-            QuestionForListOutSchema.model_validate(
-                question
-            )
-            for question in questions
-        ]
+        return facets
@@ -3,6 +3,8 @@ from typing import Annotated
 from fastapi import Depends, HTTPException
 from sqlalchemy.exc import IntegrityError
 
+from app.common.repositories import CacheRepository
+from app.common.utils import get_principal_cache_namespace
 from app.roles.repositories.role import RoleRepository
 from app.roles.schemas import RoleBaseSchema, RoleOutSchema
 from app.users.repositories import UserRepository
@@ -12,10 +14,12 @@ class RoleService:
     def __init__(
             self,
             role_repository: Annotated[RoleRepository, Depends()],
-            user_repository: Annotated[UserRepository, Depends()]
+            user_repository: Annotated[UserRepository, Depends()],
+            cache_repository: Annotated[CacheRepository, Depends()]
     ) -> None:
         self.role_repository = role_repository
         self.user_repository = user_repository
+        self.cache_repository = cache_repository
 
     async def create_role(
             self,
@@ -42,10 +46,14 @@ class RoleService:
                 status_code=404,
                 detail="Role not found"
             )
-        return await self.role_repository.attach_role_to_user(
+        is_attached = await self.role_repository.attach_role_to_user(
             role,
             user
         )
+        await self.cache_repository.bump_generation(
+            get_principal_cache_namespace(user.external_id)
+        )
+        return is_attached
 
     async def detach_role_from_user(
             self,
@@ -60,7 +68,11 @@ class RoleService:
                 detail="Role is not attached to the user"
             )
 
-        return await self.role_repository.detach_role_from_user(
+        is_detached = await self.role_repository.detach_role_from_user(
             role,
             user
         )
+        await self.cache_repository.bump_generation(
+            get_principal_cache_namespace(user.external_id)
+        )
+        return is_detached
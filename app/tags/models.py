@@ -1,3 +1,4 @@
+from sqlalchemy import Index
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 
 from app.common.models_mixins import int_pk, CreatedAtMixin
@@ -6,6 +7,14 @@ from app.core.adapters.postgres.postgres_adapter import Base
 
 class TagModel(CreatedAtMixin, Base):
     __tablename__ = 'tags'
+    __table_args__ = (
+        Index(
+            'ix_tags_name_trgm',
+            'name',
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'}
+        ),
+    )
 
     id: Mapped[int_pk]
     name: Mapped[str] = mapped_column(unique=True)
@@ -58,4 +58,4 @@ async def delete_tag(
         tag_service: Annotated[TagService, Depends()],
         tag_id: int
 ) -> bool:
-    return await tag_service.tag_repository.delete(tag_id)
+    return await tag_service.delete_tag(tag_id)
@@ -2,6 +2,10 @@ from typing import Annotated
 
 from fastapi import Depends, HTTPException
 
+from app.common.constants import SEARCH_CACHE_NAMESPACE
+from app.common.repositories import CacheRepository
+from app.common.utils import get_question_cache_namespace
+from app.questions.repositories import QuestionRepository
 from app.tags.repositories import TagRepository
 from app.tags.schemas import TagBaseSchema, TagOutSchema
 
@@ -9,9 +13,13 @@ from app.tags.schemas import TagBaseSchema, TagOutSchema
 class TagService:
     def __init__(
             self,
-            tag_repository: Annotated[TagRepository, Depends()]
+            tag_repository: Annotated[TagRepository, Depends()],
+            question_repository: Annotated[QuestionRepository, Depends()],
+            cache_repository: Annotated[CacheRepository, Depends()]
     ) -> None:
         self.tag_repository = tag_repository
+        self.question_repository = question_repository
+        self.cache_repository = cache_repository
 
     async def create_tag(
             self,
@@ -25,5 +33,23 @@ class TagService:
                 status_code=400,
                 detail='Tag already exists'
             )
+        # A new tag is on no question yet, so no search can change.
         tag_model = await self.tag_repository.create(tag_schema)
         return TagOutSchema.model_validate(tag_model)
+
+    async def delete_tag(
+            self,
+            tag_id: int
+    ) -> bool:
+        # The cached pages of the questions showing the tag are dropped,
+        # they are looked up before the delete cascades to them.
+        question_ids = await self.question_repository.get_ids_by_tag(tag_id)
+        is_deleted = await self.tag_repository.delete(tag_id)
+        await self.cache_repository.bump_generation(SEARCH_CACHE_NAMESPACE)
+        await self.cache_repository.bump_generations(
+            [
+                get_question_cache_namespace(question_id)
+                for question_id in question_ids
+            ]
+        )
+        return is_deleted
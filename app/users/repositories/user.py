@@ -1,5 +1,5 @@
 from fastapi import HTTPException
-from sqlalchemy import select, Select, text, case, distinct, Numeric, cast, \
+from sqlalchemy import select, Select, case, distinct, Numeric, cast, \
     desc, Sequence
 from sqlalchemy.dialects.postgresql import INTERVAL
 from sqlalchemy.exc import IntegrityError
@@ -8,8 +8,9 @@ from sqlalchemy.sql.functions import coalesce, func
 
 from app.answers.models import AnswerModel
 from app.common.repositories.base_repository import BaseRepository
-from app.roles.models import RoleModel
-from app.users.models import UserModel
+from app.permissions.models import PermissionModel
+from app.roles.models import RoleModel, permission_role
+from app.users.models import UserModel, role_user
 from app.votes.models import VotesModel
 
 
@@ -45,18 +46,24 @@ class UserRepository(BaseRepository):
         )
         return await self.session.scalar(stmt)
 
-    async def get_user_permissions(
+    async def get_user_permission_mask(
             self,
             user_id: int
-    ) -> set[str]:
-        stmt = text(
-            '''SELECT permissions_1.name
-            FROM users LEFT OUTER JOIN (role_user AS role_user_1 JOIN permission_role AS permission_role_1 ON role_user_1.role_id = permission_role_1.role_id JOIN permissions AS permissions_1 ON permissions_1.id = permission_role_1.permission_id) ON users.id = role_user_1.user_id
-            WHERE users.id = :user_id;
-            '''
+    ) -> int:
+        stmt = (
+            select(distinct(PermissionModel.bit_index))
+            .join(
+                permission_role,
+                permission_role.c.permission_id == PermissionModel.id
+            )
+            .join(role_user, role_user.c.role_id == permission_role.c.role_id)
+            .where(
+                role_user.c.user_id == user_id,
+                PermissionModel.bit_index.is_not(None)
+            )
         )
-        result = await self.session.scalars(stmt, {'user_id': user_id})
-        return set(result.all())
+        bit_indexes = await self.session.scalars(stmt)
+        return sum(1 << bit_index for bit_index in bit_indexes)
 
     async def attach_roles_to_user(
             self,
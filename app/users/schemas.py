@@ -19,8 +19,9 @@ class UserCreatePayloadSchema(UserCreateSchema):
 
 
 class UserInRequestSchema(UserBaseSchema):
+    id: int
     nick_name: str
-    permissions: set[str]
+    permission_mask: int
 
 
 class UserUpdateSchema(UserBaseSchema):
@@ -1,13 +1,21 @@
+import uuid
 from typing import Annotated
 
 from fastapi import Depends, HTTPException, UploadFile
 from keycloak import KeycloakError
 
-from app.common.repositories import StorageItemRepository
+from app.common.constants import AVATAR_LIST_VARIANT_SIZE, \
+    AVATAR_PROFILE_VARIANT_SIZE
+from app.common.repositories import StorageItemRepository, CacheRepository
 from app.common.schemas import StorageItemCreateSchema
 from app.common.services import StorageItemService, KeycloakService, \
     ReportService
+from app.common.tasks import generate_avatar_variants_task, \
+    release_storage_item_task
+from app.common.utils import get_principal_cache_namespace, \
+    get_question_cache_namespace
 from app.dependencies import get_settings
+from app.questions.repositories import QuestionRepository
 from app.roles.models import RoleModel
 from app.roles.repositories import RoleRepository
 from app.users.repositories import UserRepository
@@ -24,7 +32,9 @@ class UserService:
             keycloak_service: Annotated[KeycloakService, Depends()],
             storage_item_repository: Annotated[
                 StorageItemRepository, Depends()],
-            report_service: Annotated[ReportService, Depends()]
+            report_service: Annotated[ReportService, Depends()],
+            question_repository: Annotated[QuestionRepository, Depends()],
+            cache_repository: Annotated[CacheRepository, Depends()]
     ) -> None:
         self.user_repository = user_repository
         self.role_repository = role_repository
@@ -32,6 +42,56 @@ class UserService:
         self.keycloak_service = keycloak_service
         self.storage_item_repository = storage_item_repository
         self.report_service = report_service
+        self.question_repository = question_repository
+        self.cache_repository = cache_repository
+
+    async def get_avatar_urls(
+            self,
+            avatar_file_storage_ids: list[int | None],
+            size: int | None = None
+    ) -> dict[int, str]:
+        """
+        Resolves the avatar URLs of a page of users at once: the storage
+        items are fetched with a single IN query and every distinct path
+        is signed once. Maps storage item ids to URLs, users without
+        an avatar are absent from the result.
+
+        When a size is given, the resized variant is served instead of
+        the original as soon as it has been generated.
+        """
+        item_ids = list(
+            {item_id for item_id in avatar_file_storage_ids if item_id}
+        )
+        if size is None:
+            item_models = await self.storage_item_repository.get_by_ids(
+                item_ids
+            )
+        else:
+            item_models = await (
+                self.storage_item_repository.get_by_ids_with_variant(
+                    item_ids,
+                    self.storage_item_service.get_image_variant_name(size)
+                )
+            )
+
+        storage_paths = {}
+        for item_model in item_models:
+            if item_model.parent_id is None:
+                storage_paths.setdefault(item_model.id, item_model.storage_path)
+            else:
+                storage_paths[item_model.parent_id] = item_model.storage_path
+
+        settings = get_settings()
+
+        urls_by_path = await self.storage_item_service.generate_presigned_urls(
+            settings.AWS_BUCKET_NAME,
+            list(storage_paths.values())
+        )
+
+        return {
+            item_id: urls_by_path[storage_path]
+            for item_id, storage_path in storage_paths.items()
+        }
 
     async def get_user(
             self,
@@ -39,21 +99,17 @@ class UserService:
     ) -> UserOutSchema:
         user_model = await self.user_repository.get_by_id(user_id)
 
-        settings = get_settings()
-
-        item_model = await self.storage_item_repository.get_by_id(
-            user_model.avatar_file_storage_id
+        avatar_urls = await self.get_avatar_urls(
+            [user_model.avatar_file_storage_id],
+            AVATAR_PROFILE_VARIANT_SIZE
         )
 
-        avatar_url = await self.storage_item_service.generate_presigned_url(
-            settings.AWS_BUCKET_NAME,
-            item_model.storage_path
-        ) if item_model else None
-
         return UserOutSchema.model_validate(
             {
                 **user_model.__dict__,
-                'avatar_url': avatar_url
+                'avatar_url': avatar_urls.get(
+                    user_model.avatar_file_storage_id
+                )
             }
         )
 
@@ -66,30 +122,22 @@ class UserService:
 
         users = await self.user_repository.get_multi(skip, limit)
 
-        settings = get_settings()
-
-        users_with_avatar_url = []
-
-        for user in users:
-            item_model = await self.storage_item_repository.get_by_id(
-                user.avatar_file_storage_id
-            )
-            avatar_url = await self.storage_item_service.generate_presigned_url(
-                settings.AWS_BUCKET_NAME,
-                item_model.storage_path
-            ) if item_model else None
+        avatar_urls = await self.get_avatar_urls(
+            [user.avatar_file_storage_id for user in users],
+            AVATAR_LIST_VARIANT_SIZE
+        )
 
-            user_with_avatar_url = UserOutSchema.model_validate(
+        return [
+            UserOutSchema.model_validate(
                 {
                     **user.__dict__,
-                    'avatar_url': avatar_url
+                    'avatar_url': avatar_urls.get(
+                        user.avatar_file_storage_id
+                    )
                 }
             )
-            users_with_avatar_url.append(
-                user_with_avatar_url
-            )
-
-        return users_with_avatar_url
+            for user in users
+        ]
 
     async def update_user(
             self,
@@ -107,8 +155,6 @@ class UserService:
                 detail='You are not allowed to update this user'
             )
 
-        settings = get_settings()
-
         if user_schema.email is not None:
             try:
                 await self.keycloak_service.update_account(
@@ -121,65 +167,108 @@ class UserService:
                     detail='Email already exists'
                 )
 
+        old_avatar_file_storage_id = user_model.avatar_file_storage_id
+        avatar_file_storage_id = old_avatar_file_storage_id
         if file:
-            stored_file_path = await self.storage_item_service.upload_file(
-                settings.AWS_BUCKET_NAME,
-                f'avatars/{target_user_id}',
-                file
-            )
-
-            stored_file_name = stored_file_path.split('/')[-1]
-
-            new_item_model = await (
-                self.storage_item_repository.create(
-                    StorageItemCreateSchema(
-                        original_file_name=file.filename,
-                        stored_file_name=stored_file_name,
-                        storage_path=stored_file_path
-                    )
-                ))
-
-            if user_model.avatar_file_storage_id:
-                old_item_model = await (
-                    self.storage_item_repository.get_by_id(
-                        user_model.avatar_file_storage_id
-                    )
-                )
-
-                await self.storage_item_service.delete_file(
-                    settings.AWS_BUCKET_NAME,
-                    old_item_model.storage_path
-                )
-
-                await self.storage_item_repository.delete(
-                    user_model.avatar_file_storage_id
-                )
-
+            avatar_file_storage_id = await self.__store_avatar(file)
             user_schema = UserUpdatePayloadSchema(
                 **user_schema.model_dump(exclude_unset=True),
-                avatar_file_storage_id=new_item_model.id
+                avatar_file_storage_id=avatar_file_storage_id
             )
 
-        await self.user_repository.update(
-            target_user_id,
-            user_schema
-        )
-
-        item_model = await self.storage_item_repository.get_by_id(
-            user_model.avatar_file_storage_id
+        try:
+            await self.user_repository.update(
+                target_user_id,
+                user_schema
+            )
+        except Exception:
+            # The reference taken for the new avatar is not held by the
+            # user, release it so that the item can be collected.
+            if file:
+                release_storage_item_task.delay(avatar_file_storage_id)
+            raise
+        await self.__bump_principal_version(user_model.external_id)
+        await self.__bump_question_versions(target_user_id)
+
+        if file and old_avatar_file_storage_id:
+            release_storage_item_task.delay(old_avatar_file_storage_id)
+
+        avatar_urls = await self.get_avatar_urls(
+            [avatar_file_storage_id],
+            AVATAR_PROFILE_VARIANT_SIZE
         )
-        avatar_url = await self.storage_item_service.generate_presigned_url(
-            settings.AWS_BUCKET_NAME,
-            item_model.storage_path
-        ) if item_model else None
 
         return UserOutSchema.model_validate(
             {
                 **user_model.__dict__,
-                'avatar_url': avatar_url
+                'avatar_url': avatar_urls.get(avatar_file_storage_id)
             }
         )
 
+    async def __store_avatar(
+            self,
+            file: UploadFile
+    ) -> int:
+        """
+        Stores an avatar deduplicated by its content, so that identical
+        uploads share one object and one storage item.
+        The upload is skipped when the content is already stored.
+
+        Each stored item gets a key of its own, so an item re-created
+        while a released one is being deleted never shares its object.
+        """
+        settings = get_settings()
+
+        buffer, image_type, content_hash = await (
+            self.storage_item_service.read_image(
+                file,
+                settings.MAX_AVATAR_SIZE
+            )
+        )
+        with buffer:
+            item_model = await self.storage_item_repository.get_by_content_hash(
+                content_hash
+            )
+            # The item may have been collected since it was read, the
+            # content is then uploaded again.
+            if item_model and await (
+                    self.storage_item_repository.increment_reference_count(
+                        item_model.id
+                    )
+            ):
+                return item_model.id
+
+            unique_id = uuid.uuid4()
+            stored_file_name = f'{content_hash}_{unique_id}.{image_type}'
+            stored_file_path = await self.storage_item_service.upload_image(
+                settings.AWS_BUCKET_NAME,
+                f'avatars/{stored_file_name}',
+                buffer,
+                image_type
+            )
+
+        # A concurrent upload of the same content may have created the
+        # item meanwhile, the object uploaded here is then dropped.
+        item_id, is_created = await (
+            self.storage_item_repository.create_or_reference(
+                StorageItemCreateSchema(
+                    original_file_name=file.filename,
+                    stored_file_name=stored_file_name,
+                    storage_path=stored_file_path,
+                    content_hash=content_hash
+                )
+            )
+        )
+        if is_created:
+            generate_avatar_variants_task.delay(item_id)
+        else:
+            await self.storage_item_service.delete_file(
+                settings.AWS_BUCKET_NAME,
+                stored_file_path
+            )
+
+        return item_id
+
     async def delete_user(
             self,
             target_user_id: int,
@@ -191,7 +280,48 @@ class UserService:
                 status_code=403,
                 detail='You are not allowed to delete this user'
             )
-        return await self.user_repository.delete(target_user_id)
+        question_ids = await self.question_repository.get_ids_by_user(
+            target_user_id
+        )
+        is_deleted = await self.user_repository.delete(target_user_id)
+        await self.__bump_principal_version(user.external_id)
+        await self.cache_repository.bump_generations(
+            [
+                get_question_cache_namespace(question_id)
+                for question_id in question_ids
+            ]
+        )
+        # The foreign key only nulls the avatar of the deleted user, its
+        # reference has to be released explicitly.
+        if user.avatar_file_storage_id:
+            release_storage_item_task.delay(user.avatar_file_storage_id)
+        return is_deleted
+
+    async def __bump_principal_version(
+            self,
+            external_id: str
+    ) -> None:
+        await self.cache_repository.bump_generation(
+            get_principal_cache_namespace(external_id)
+        )
+
+    async def __bump_question_versions(
+            self,
+            user_id: int
+    ) -> None:
+        """
+        Drops the cached pages of the questions of a user, which embed
+        the profile of their author.
+        """
+        question_ids = await self.question_repository.get_ids_by_user(
+            user_id
+        )
+        await self.cache_repository.bump_generations(
+            [
+                get_question_cache_namespace(question_id)
+                for question_id in question_ids
+            ]
+        )
 
     async def __check_if_roles_already_attached(
             self,
@@ -211,7 +341,7 @@ class UserService:
             requesting_user_id: int,
             target_user_id: int
     ) -> bool:
-        await self.user_repository.get_entity_if_exists(
+        user = await self.user_repository.get_entity_if_exists(
             target_user_id
         )
         if requesting_user_id == target_user_id:
@@ -230,6 +360,7 @@ class UserService:
             target_user_id,
             roles
         )
+        await self.__bump_principal_version(user.external_id)
 
         return True
 
@@ -237,7 +368,7 @@ class UserService:
             self,
             target_user_id: int
     ) -> bool:
-        await self.user_repository.get_entity_if_exists(
+        user = await self.user_repository.get_entity_if_exists(
             target_user_id
         )
 
@@ -246,21 +377,10 @@ class UserService:
             target_user_id,
             roles
         )
+        await self.__bump_principal_version(user.external_id)
 
         return True
 
-    async def get_user_permissions(
-            self,
-            user_id: int
-    ) -> set[str]:
-        user = await self.user_repository.get_by_id_with_joins(user_id)
-        user_permissions = {
-            permission.name for role in user.roles
-            for permission in role.permissions
-        }
-
-        return user_permissions
-
     async def check_and_update_user_role(
             self,
             user_id: int,
@@ -279,4 +399,6 @@ class UserService:
                 user_id,
                 roles
             )
+        user = await self.user_repository.get_by_id(user_id)
+        await self.__bump_principal_version(user.external_id)
         return True
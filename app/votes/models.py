@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, UniqueConstraint
+from sqlalchemy import ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.common.models_mixins import int_pk
@@ -11,6 +11,7 @@ class VotesModel(Base):
         UniqueConstraint(
             'user_id', 'question_id', 'answer_id', name='unique_user_vote'
         ),
+        Index('ix_votes_user_id_answer_id', 'user_id', 'answer_id'),
     )
 
     id: Mapped[int_pk]
@@ -1,6 +1,68 @@
+from sqlalchemy import update, select, or_
+
+from app.answers.models import AnswerModel
 from app.common.repositories.base_repository import BaseRepository
+from app.questions.models import QuestionModel
 from app.votes.models import VotesModel
 
 
 class VoteRepository(BaseRepository):
     model = VotesModel
+
+    async def update_entity_vote_counters(
+            self,
+            entity_model: type[QuestionModel] | type[AnswerModel],
+            entity_id: int,
+            is_upvote: bool,
+            increase: bool
+    ) -> None:
+        """
+        Adjusts the denormalized vote counters of a question or an answer.
+
+        The statement is only flushed, not committed, so that the counters
+        are committed in the same transaction as the vote row itself.
+        updated_at is kept as is, since a vote is not an edit.
+        """
+        delta = 1 if increase else -1
+        counter = (
+            entity_model.upvote_count if is_upvote
+            else entity_model.downvote_count
+        )
+        await self.session.execute(
+            update(entity_model)
+            .where(entity_model.id == entity_id)
+            .values(
+                {
+                    counter: counter + delta,
+                    entity_model.score: entity_model.score + (
+                        delta if is_upvote else -delta
+                    ),
+                    entity_model.updated_at: entity_model.updated_at
+                }
+            )
+        )
+
+    async def get_user_votes_for_question(
+            self,
+            user_id: int,
+            question_id: int
+    ) -> list[VotesModel]:
+        """
+        Returns the votes of a user on a question and on its answers.
+        Only the user's own rows are read, through the
+        (user_id, question_id) and (user_id, answer_id) indexes, instead
+        of loading every vote of the page.
+        """
+        answer_ids = (
+            select(AnswerModel.id)
+            .where(AnswerModel.question_id == question_id)
+        )
+        stmt = select(self.model).where(
+            self.model.user_id == user_id,
+            or_(
+                self.model.question_id == question_id,
+                self.model.answer_id.in_(answer_ids)
+            )
+        )
+        votes = await self.session.scalars(stmt)
+        return list(votes.all())
@@ -2,7 +2,12 @@ from typing import Annotated
 
 from fastapi import Depends, HTTPException
 
+from app.answers.models import AnswerModel
 from app.answers.repositories import AnswerRepository
+from app.common.constants import SEARCH_SCORE_CACHE_NAMESPACE
+from app.common.repositories import CacheRepository
+from app.common.utils import get_question_cache_namespace
+from app.questions.models import QuestionModel
 from app.questions.repositories import QuestionRepository
 from app.users.repositories import UserRepository
 from app.users.services import UserService
@@ -18,13 +23,15 @@ class VoteService:
             question_repository: Annotated[QuestionRepository, Depends()],
             answer_repository: Annotated[AnswerRepository, Depends()],
             user_repository: Annotated[UserRepository, Depends()],
-            user_service: Annotated[UserService, Depends()]
+            user_service: Annotated[UserService, Depends()],
+            cache_repository: Annotated[CacheRepository, Depends()]
     ) -> None:
         self.vote_repository = vote_repository
         self.question_repository = question_repository
         self.answer_repository = answer_repository
         self.user_repository = user_repository
         self.user_service = user_service
+        self.cache_repository = cache_repository
 
     async def __get_entity_repository(
             self,
@@ -40,6 +47,14 @@ class VoteService:
                 detail='Invalid entity type'
             )
 
+    @staticmethod
+    async def __get_question_id(
+            entity: QuestionModel | AnswerModel
+    ) -> int:
+        if isinstance(entity, AnswerModel):
+            return entity.question_id
+        return entity.id
+
     async def create_vote(
             self,
             vote_schema: VoteCreateSchema,
@@ -72,6 +87,12 @@ class VoteService:
                 detail=f'You have already voted on this {entity_type}'
             )
 
+        await self.vote_repository.update_entity_vote_counters(
+            repository.model,
+            entity_id,
+            is_upvote,
+            True
+        )
         vote_model = await self.vote_repository.create(
             VoteCreatePayloadSchema(
                 **vote_schema.__dict__,
@@ -79,6 +100,15 @@ class VoteService:
                 is_upvote=is_upvote
             )
         )
+        # Answer scores are not searchable, and a question vote keeps
+        # everything but the score of the question.
+        if isinstance(entity, QuestionModel):
+            await self.cache_repository.bump_generation(
+                SEARCH_SCORE_CACHE_NAMESPACE
+            )
+        await self.cache_repository.bump_generation(
+            get_question_cache_namespace(await self.__get_question_id(entity))
+        )
 
         user_reputation = await self.user_repository.update_reputation(
             target_user_id,
@@ -138,4 +168,20 @@ class VoteService:
                 True
             )
 
-        return await self.vote_repository.delete(vote.id)
+        await self.vote_repository.update_entity_vote_counters(
+            repository.model,
+            entity_id,
+            is_upvote,
+            False
+        )
+        is_deleted = await self.vote_repository.delete(vote.id)
+        # Answer scores are not searchable, and a question vote keeps
+        # everything but the score of the question.
+        if isinstance(entity, QuestionModel):
+            await self.cache_repository.bump_generation(
+                SEARCH_SCORE_CACHE_NAMESPACE
+            )
+        await self.cache_repository.bump_generation(
+            get_question_cache_namespace(await self.__get_question_id(entity))
+        )
+        return is_deleted
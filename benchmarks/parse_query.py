@@ -0,0 +1,32 @@
+"""Microbenchmark for the search query parser.
+
+Run from the project root with:
+
+    python -m benchmarks.parse_query
+"""
+import timeit
+
+from app.common.search_parser import parse_search_query
+
+SAMPLE_QUERIES = [
+    'async session',
+    '[python] [-django] score:5 how to await a coroutine',
+    'title:"connection pool" body:"timeout" isanswered:yes',
+    'user:42 created:2023-01..2024-06 lastactive:2024 hasaccepted:no',
+    '[fastapi] [pydantic] "response model" score:-2..10 user:7 '
+    'created:2022 isanswered:true dependency injection',
+]
+NUMBER = 10_000
+
+
+def main() -> None:
+    for query in SAMPLE_QUERIES:
+        seconds = timeit.timeit(
+            lambda: parse_search_query(query),
+            number=NUMBER
+        )
+        print(f'{seconds / NUMBER * 1_000_000:8.2f} us  {query}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Compares the eager loading strategies of the question page on a
+synthetic large thread: rows fetched from Postgres, statements issued
+and time per load.
+
+Requires DATABASE_URL to point to a migrated database. The thread is
+created inside a transaction that is rolled back at the end.
+Run from the project root with:
+
+    python -m benchmarks.question_detail_loading --answers 20
+
+Joined loading fetches the product of all sibling collections, so its
+row count grows multiplicatively with every size option.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.adapters.postgres import base  # noqa: F401, registers models
+from app.answers.models import AnswerModel
+from app.comments.models import CommentModel
+from app.common.types import LoadStrategyEnum
+from app.dependencies import get_settings
+from app.questions.models import QuestionModel, QuestionTagModel
+from app.questions.repositories import QuestionRepository
+from app.tags.models import TagModel
+from app.users.models import UserModel
+from app.votes.models import VotesModel
+
+
+async def insert_ids(
+        session: AsyncSession,
+        model,
+        values: list[dict]
+) -> list[int]:
+    ids = await session.scalars(
+        insert(model).returning(model.id),
+        values
+    )
+    return ids.all()
+
+
+async def seed_thread(
+        session: AsyncSession,
+        options: argparse.Namespace
+) -> int:
+    run = uuid.uuid4().hex[:8]
+    user_ids = await insert_ids(
+        session,
+        UserModel,
+        [
+            {'nick_name': f'user-{run}-{i}', 'email': f'{run}-{i}@example.com'}
+            for i in range(max(options.answers, options.votes, 1) + 1)
+        ]
+    )
+    author_id, user_ids = user_ids[0], user_ids[1:]
+
+    question_id = (await insert_ids(
+        session,
+        QuestionModel,
+        [{'title': 'Synthetic thread', 'body': 'body', 'user_id': author_id}]
+    ))[0]
+    tag_ids = await insert_ids(
+        session,
+        TagModel,
+        [{'name': f'tag-{run}-{i}'} for i in range(options.tags)]
+    )
+    await session.execute(
+        insert(QuestionTagModel),
+        [{'question_id': question_id, 'tag_id': tag_id} for tag_id in tag_ids]
+    )
+    answer_ids = await insert_ids(
+        session,
+        AnswerModel,
+        [
+            {'body': 'answer', 'question_id': question_id, 'user_id': user_id}
+            for user_id in user_ids[:options.answers]
+        ]
+    )
+
+    comments = []
+    votes = []
+    for entity in [{'question_id': question_id}] + [
+        {'answer_id': answer_id} for answer_id in answer_ids
+    ]:
+        comments.extend(
+            {
+                'body': 'comment',
+                'user_id': user_ids[i % len(user_ids)],
+                **entity
+            }
+            for i in range(options.comments)
+        )
+        votes.extend(
+            {'is_upvote': True, 'user_id': user_ids[i], **entity}
+            for i in range(options.votes)
+        )
+    await session.execute(insert(CommentModel), comments)
+    await session.execute(insert(VotesModel), votes)
+
+    return question_id
+
+
+async def main(
+        options: argparse.Namespace
+) -> None:
+    settings = get_settings()
+    engine = create_async_engine(settings.DATABASE_URL)
+
+    counters = {'statements': 0, 'rows': 0}
+
+    @event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def count_rows(conn, cursor, statement, parameters, context, executemany):
+        counters['statements'] += 1
+        # The asyncpg cursor adapter buffers the whole result on execute
+        counters['rows'] += len(getattr(cursor, '_rows', ()))
+
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection, expire_on_commit=False)
+        question_id = await seed_thread(session, options)
+        repository = QuestionRepository(session)
+
+        print(
+            f'{options.answers} answers, {options.comments} comments and '
+            f'{options.votes} votes per entry, {options.tags} tags\n'
+        )
+        for strategy in LoadStrategyEnum:
+            session.expunge_all()
+            counters.update(statements=0, rows=0)
+            await repository.get_by_id_with_joins(question_id, strategy)
+            statements, rows = counters['statements'], counters['rows']
+
+            started_at = time.perf_counter()
+            for _ in range(options.repeat):
+                session.expunge_all()
+                await repository.get_by_id_with_joins(question_id, strategy)
+            elapsed = (time.perf_counter() - started_at) / options.repeat
+
+            print(
+                f'{strategy.value:>9}: {rows:>8} rows '
+                f'{statements:>3} statements {elapsed * 1000:9.2f} ms'
+            )
+
+        await session.close()
+        await transaction.rollback()
+
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--answers', type=int, default=10)
+    parser.add_argument('--comments', type=int, default=5)
+    parser.add_argument('--votes', type=int, default=10)
+    parser.add_argument('--tags', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
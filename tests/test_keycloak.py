@@ -0,0 +1,155 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.common.services.keycloak import KeycloakService
+from app.dependencies import get_settings
+
+
+def generate_jwk(
+        kid: str
+) -> tuple[rsa.RSAPrivateKey, dict]:
+    private_key = rsa.generate_private_key(
+        public_exponent=65537,
+        key_size=2048
+    )
+    jwk = jwt.algorithms.RSAAlgorithm.to_jwk(
+        private_key.public_key(),
+        as_dict=True
+    )
+    return private_key, {**jwk, 'kid': kid, 'use': 'sig', 'alg': 'RS256'}
+
+
+def encode_token(
+        private_key: rsa.RSAPrivateKey,
+        kid: str,
+        **claims
+) -> str:
+    settings = get_settings()
+    payload = {
+        'sub': 'external-user-id',
+        'sid': 'session-id',
+        'iss': KeycloakService.get_issuer(),
+        'azp': settings.KEYCLOAK_CLIENT_ID,
+        'aud': 'account',
+        'exp': int(time.time()) + 300,
+        **claims
+    }
+    return jwt.encode(
+        payload,
+        private_key,
+        algorithm='RS256',
+        headers={'kid': kid}
+    )
+
+
+@pytest.fixture
+def signing_key(
+        monkeypatch: pytest.MonkeyPatch
+) -> rsa.RSAPrivateKey:
+    """
+    Installs an offline JWK set with a single key, as if it had just
+    been fetched, and replaces the Keycloak certs endpoint with a mock
+    serving the same set.
+    """
+    private_key, jwk = generate_jwk('offline-key')
+    monkeypatch.setattr(KeycloakService, 'signing_keys', {})
+    monkeypatch.setattr(KeycloakService, 'signing_keys_lock', asyncio.Lock())
+    monkeypatch.setattr(
+        KeycloakService.keycloak_openid,
+        'a_certs',
+        AsyncMock(return_value={'keys': [jwk]})
+    )
+    KeycloakService.set_signing_keys({'keys': [jwk]})
+    monkeypatch.setattr(
+        KeycloakService,
+        'signing_keys_refreshed_at',
+        time.monotonic()
+    )
+    return private_key
+
+
+def test_decode_valid_token(
+        signing_key: rsa.RSAPrivateKey
+) -> None:
+    token = encode_token(signing_key, 'offline-key')
+
+    decoded = asyncio.run(KeycloakService.decode_token(token))
+
+    assert decoded.sub == 'external-user-id'
+    assert decoded.sid == 'session-id'
+    KeycloakService.keycloak_openid.a_certs.assert_not_called()
+
+
+def test_decode_expired_token(
+        signing_key: rsa.RSAPrivateKey
+) -> None:
+    token = encode_token(
+        signing_key,
+        'offline-key',
+        exp=int(time.time()) - 60
+    )
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        asyncio.run(KeycloakService.decode_token(token))
+
+
+def test_decode_token_with_wrong_issuer(
+        signing_key: rsa.RSAPrivateKey
+) -> None:
+    token = encode_token(
+        signing_key,
+        'offline-key',
+        iss='https://keycloak.example.com/realms/other'
+    )
+
+    with pytest.raises(jwt.InvalidIssuerError):
+        asyncio.run(KeycloakService.decode_token(token))
+
+
+def test_decode_token_for_another_client(
+        signing_key: rsa.RSAPrivateKey
+) -> None:
+    token = encode_token(signing_key, 'offline-key', azp='other-client')
+
+    with pytest.raises(jwt.InvalidAudienceError):
+        asyncio.run(KeycloakService.decode_token(token))
+
+
+def test_decode_token_with_unknown_kid_refreshes_once(
+        signing_key: rsa.RSAPrivateKey,
+        monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # The refresh interval has passed since the keys were fetched.
+    monkeypatch.setattr(KeycloakService, 'signing_keys_refreshed_at', None)
+    unknown_key, _ = generate_jwk('unknown-key')
+    token = encode_token(unknown_key, 'unknown-key')
+
+    with pytest.raises(jwt.InvalidKeyError):
+        asyncio.run(KeycloakService.decode_token(token))
+    # Within the refresh interval the JWK set is not fetched again.
+    with pytest.raises(jwt.InvalidKeyError):
+        asyncio.run(KeycloakService.decode_token(token))
+
+    KeycloakService.keycloak_openid.a_certs.assert_awaited_once()
+
+
+def test_decode_token_signed_with_rotated_key(
+        signing_key: rsa.RSAPrivateKey,
+        monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(KeycloakService, 'signing_keys_refreshed_at', None)
+    rotated_key, rotated_jwk = generate_jwk('rotated-key')
+    KeycloakService.keycloak_openid.a_certs.return_value = {
+        'keys': [rotated_jwk]
+    }
+    token = encode_token(rotated_key, 'rotated-key')
+
+    decoded = asyncio.run(KeycloakService.decode_token(token))
+
+    assert decoded.sub == 'external-user-id'
+    KeycloakService.keycloak_openid.a_certs.assert_awaited_once()